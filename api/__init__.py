@@ -6,12 +6,25 @@ from flask_swagger_ui import get_swaggerui_blueprint
 from .config import Config
 from flask_jwt_extended import JWTManager
 from flask_migrate import Migrate
+from .feed import Timeline
+from .jobs import JobQueue
+from .passwords import PasswordPool, PasswordPoolBusy
+from .ratelimit import RateLimiter, RateLimitExceeded
+from .revocation import RevocationCache
+from .serializers import JSONProvider
+from .storage import Storage
 
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
 jwt = JWTManager()
 migrate = Migrate()
+revocation_cache = RevocationCache()
+jobs = JobQueue()
+password_pool = PasswordPool()
+limiter = RateLimiter()
+storage = Storage()
+feed = Timeline()
 
 
 # Swagger configuration
@@ -32,6 +45,9 @@ def create_app():
     # Load the configuration
     app.config.from_object(Config)
 
+    # Encode responses with orjson when available, datetimes as ISO-8601
+    app.json = JSONProvider(app)
+
     # Configure cors
     CORS(app, resources={r"*": {"origins": "*"}})
 
@@ -45,14 +61,39 @@ def create_app():
     # Initialize Flask-Migrate
     migrate.init_app(app, db)
 
-    from api.models.tokenblacklist import TokenBlacklist
+    # Initialize the password hashing pool
+    password_pool.init_app(app)
+
+    # Initialize rate limiting of the authentication endpoints
+    limiter.init_app(app)
+
+    # Initialize the in-process token revocation cache
+    revocation_cache.init_app(app)
+
+    # Initialize picture file storage
+    storage.init_app(app)
+
+    # Initialize the in-process home feed timeline
+    feed.init_app(app)
+
+    # Initialize the background job queue and register its handlers
+    jobs.init_app(app)
+    import api.tasks  # noqa: F401
 
     # Register JWT token blacklist checker
     @jwt.token_in_blocklist_loader
     def check_if_token_is_blacklisted(jwt_header, jwt_payload):
-        jti = jwt_payload["jti"]
-        token = TokenBlacklist.query.filter_by(jti=jti).first()
-        return token is not None
+        return revocation_cache.is_revoked(jwt_payload["jti"])
+
+    # Load the token's user once per request; it is exposed as current_user
+    @jwt.user_lookup_loader
+    def load_current_user(jwt_header, jwt_payload):
+        from api.models.user import User
+        return db.session.get(User, jwt_payload["sub"])
+
+    @jwt.user_lookup_error_loader
+    def user_lookup_error_callback(jwt_header, jwt_payload):
+        return jsonify({"error": "User not found"}), 404
 
     @jwt.revoked_token_loader
     def revoked_token_callback(jwt_header, jwt_payload):
@@ -62,19 +103,59 @@ def create_app():
     def expired_token_callback(jwt_header, jwt_payload):
         return jsonify({"error": "Your token has expired, please login again"}), 401
 
+    from api.pagination import PaginationError
+
+    @app.errorhandler(PaginationError)
+    def pagination_error_callback(err):
+        return jsonify({"error": str(err)}), 400
+
+    from api.bulk import BulkRequestError
+
+    @app.errorhandler(BulkRequestError)
+    def bulk_request_error_callback(err):
+        return jsonify({"error": str(err)}), 400
+
+    from api.serializers import IncludeError
+
+    @app.errorhandler(IncludeError)
+    def include_error_callback(err):
+        return jsonify({"error": str(err)}), 400
+
+    @app.errorhandler(PasswordPoolBusy)
+    def password_pool_busy_callback(err):
+        response = jsonify({"error": "Server is busy, please try again shortly"})
+        response.headers['Retry-After'] = str(err.retry_after)
+        return response, 503
+
+    @app.errorhandler(RateLimitExceeded)
+    def rate_limit_callback(err):
+        response = jsonify({"error": "Too many requests, please try again later"})
+        response.headers['Retry-After'] = str(err.retry_after)
+        return response, 429
+
+    @app.errorhandler(413)
+    def request_too_large_callback(err):
+        return jsonify({"error": "File is too large"}), 413
+
     # Register blueprints (routes)
     from api.routes.base_routes import base_bp
     from api.routes.user_routes import user_bp
     from api.routes.picture_routes import picture_bp
     from api.routes.comment_routes import comment_bp
     from api.routes.admin_routes import admin_bp
+    from api.routes.feed_routes import feed_bp
 
     app.register_blueprint(base_bp, url_prefix='/api')
     app.register_blueprint(user_bp, url_prefix='/api')
     app.register_blueprint(picture_bp, url_prefix='/api')
     app.register_blueprint(comment_bp, url_prefix='/api')
     app.register_blueprint(admin_bp, url_prefix='/api')
+    app.register_blueprint(feed_bp, url_prefix='/api')
 
     app.register_blueprint(swaggerui_blueprint, url_prefix=SWAGGER_URL)
 
+    # Register CLI commands
+    from api.commands import register_commands
+    register_commands(app)
+
     return app
@@ -1,37 +1,74 @@
 from datetime import timedelta
 from flask import jsonify
-from flask_jwt_extended import create_access_token, get_jwt_identity, verify_jwt_in_request
+from flask_jwt_extended import create_access_token, current_user, get_jwt, verify_jwt_in_request
 from api.models.user import User
-from api import bcrypt
+from api import db
 from functools import wraps
 
 
 def authenticate_user(email, password):
     """autenticate a user"""
     user = User.query.filter_by(email=email).first()
-    if user and bcrypt.check_password_hash(user.password_hash, password):
+    if user and user.check_password(password):
+        # Move the stored hash to the configured cost while the password is at hand
+        if user.password_needs_rehash():
+            user.set_password(password)
+            db.session.commit()
         return user
     return
 
 
+# Permissions granted by each role, embedded in access tokens
+ROLE_PERMISSIONS = {
+    'user': [],
+    'admin': ['users:read', 'users:promote', 'users:delete', 'pictures:read', 'pictures:delete', 'comments:read',
+              'comments:delete', 'metrics:read'],
+}
+
+
 def generate_token(user):
-    """create an access token"""
-    access_token = create_access_token(identity=user.id, expires_delta=timedelta(hours=1))
+    """create an access token carrying the user's role and permissions"""
+    claims = {
+        "role": user.role,
+        "perms": ROLE_PERMISSIONS.get(user.role, []),
+        "ver": user.token_version,
+    }
+    access_token = create_access_token(identity=user.id, additional_claims=claims,
+                                       expires_delta=timedelta(hours=1))
     return access_token
 
 
-def role_required(role):
+def _authorize(allowed):
+    """decorator letting a request through when allowed(role, permissions) holds for its token"""
     def decorator(f):
         @wraps(f)
         def decorated_function(*args, **kwargs):
             try:
                 verify_jwt_in_request()
-                current_user_id = get_jwt_identity()
-                user = User.query.get(current_user_id)
-                if not user or user.role != role:
-                    return jsonify({"error": "Insufficient permissions"}), 403
-                return f(*args, **kwargs)
             except Exception as err:
                 return jsonify({"error": "Invalid token"}), 401
+            claims = get_jwt()
+            if 'role' not in claims:
+                # Tokens issued before roles were embedded
+                token_role = current_user.role
+                permissions = ROLE_PERMISSIONS.get(token_role, [])
+            elif claims.get('ver') != current_user.token_version:
+                return jsonify({"error": "Your permissions have changed, please login again"}), 401
+            else:
+                token_role = claims['role']
+                permissions = claims.get('perms', [])
+            if not allowed(token_role, permissions):
+                return jsonify({"error": "Insufficient permissions"}), 403
+            return f(*args, **kwargs)
         return decorated_function
     return decorator
+
+
+def role_required(role):
+    """authorize from the role claim of the verified token"""
+    return _authorize(lambda token_role, permissions: token_role == role)
+
+
+def permission_required(permission):
+    """authorize from the perms claim of the verified token, e.g. 'users:read'"""
+    return _authorize(lambda token_role, permissions: permission in permissions)
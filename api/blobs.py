@@ -0,0 +1,147 @@
+import os
+import re
+from collections import Counter
+from sqlalchemy.exc import IntegrityError
+from flask import current_app
+from api import db, storage
+from api.models.blob import Blob
+from api.models.picture import Picture
+from api.storage import shard_prefix, sharded_key
+from api.uploads import ingest_upload
+
+
+# Stored names of content-addressed files: '<sha256>.<ext>' for the original
+# and '<sha256>_<size>.<ext>' for its resized variants
+CONTENT_KEY = re.compile(r'(?:^|/)([0-9a-f]{64})(?:_\d+)?\.\w+$')
+
+
+def store_upload(stream, max_size):
+    """store an upload content-addressed and take a reference to it; returns the Blob
+
+    Identical content is kept once: a repeat upload only bumps the blob's
+    refcount and its temporary copy is discarded. The reference is part of
+    the caller's transaction.
+    """
+    tmp_path, content_hash, size, extension = ingest_upload(stream, storage.staging_dir, max_size)
+
+    if _acquire(content_hash):
+        os.remove(tmp_path)
+        return db.session.get(Blob, content_hash)
+
+    key = sharded_key(f"{content_hash}.{extension}", current_app.config['STORAGE_FANOUT_DEPTH'])
+    try:
+        # The row goes in before the file, so a delete_files job still
+        # clearing old copies of this content waits for it (see api/tasks.py)
+        with db.session.begin_nested():
+            blob = Blob(content_hash=content_hash, key=key, size=size, refcount=1)
+            db.session.add(blob)
+    except IntegrityError:
+        # A concurrent upload of the same content created the blob first
+        os.remove(tmp_path)
+        _acquire(content_hash)
+        return db.session.get(Blob, content_hash)
+    storage.put_file(key, tmp_path)
+    return blob
+
+
+def content_hash_of(key):
+    """the content hash a storage key was named after, None for legacy names"""
+    match = CONTENT_KEY.search(key)
+    return match.group(1) if match else None
+
+
+def release_picture_files(picture):
+    """drop a picture's reference to its blob; returns the storage keys that are now unused
+
+    The returned files should be deleted only after the caller commits.
+    Pictures stored before deduplication own their files outright.
+    """
+    variants = list((picture.variants or {}).values())
+    if not picture.content_hash or not db.session.get(Blob, picture.content_hash):
+        return [picture.image_url, *variants]
+
+    db.session.execute(
+        db.update(Blob).where(Blob.content_hash == picture.content_hash).values(refcount=Blob.refcount - 1))
+    deleted = db.session.execute(
+        db.delete(Blob).where(Blob.content_hash == picture.content_hash, Blob.refcount <= 0))
+    if deleted.rowcount:
+        return [picture.image_url, *variants]
+    return []
+
+
+def release_pictures_files(picture_ids):
+    """release_picture_files() for many pictures at once; returns the now unused storage keys
+
+    Blob refcounts drop by one statement however many pictures are released,
+    and the same rule applies: files go only when no remaining picture
+    shares them, and only after the caller commits.
+    """
+    rows = db.session.query(Picture.image_url, Picture.variants, Picture.content_hash).filter(
+        Picture.id.in_(picture_ids)).all()
+
+    released = Counter(row.content_hash for row in rows if row.content_hash)
+    tracked, gone = set(), set()
+    if released:
+        tracked = set(db.session.scalars(db.select(Blob.content_hash).where(Blob.content_hash.in_(released))))
+        db.session.execute(
+            db.update(Blob).where(Blob.content_hash.in_(released))
+            .values(refcount=Blob.refcount - db.case(released, value=Blob.content_hash)))
+        gone = set(db.session.scalars(
+            db.delete(Blob).where(Blob.content_hash.in_(released), Blob.refcount <= 0).returning(Blob.content_hash)))
+
+    keys = set()
+    for row in rows:
+        if row.content_hash in gone or row.content_hash not in tracked:
+            keys.update([row.image_url, *(row.variants or {}).values()])
+    return sorted(keys)
+
+
+def reshard_picture_files(depth, batch_size=500):
+    """move flat-layout picture files under fan-out directories
+
+    Works through pictures whose image_url has no directory part, one batch
+    per transaction: files (original and variants) are moved first and the
+    rows rewritten after, so an interrupted run can simply be started again.
+    Returns (pictures updated, files moved, files missing).
+    """
+    updated = moved = missing = 0
+    while True:
+        originals = [
+            row.image_url for row in db.session.query(Picture.image_url)
+            .filter(~Picture.image_url.contains('/')).distinct().limit(batch_size)
+        ]
+        if not originals:
+            break
+
+        for original in originals:
+            prefix = shard_prefix(original, depth)
+            pictures = Picture.query.filter_by(image_url=original).all()
+
+            flat_keys = {original, *(key for picture in pictures for key in (picture.variants or {}).values())}
+            for key in flat_keys:
+                if '/' in key:
+                    continue
+                if storage.exists(key):
+                    storage.move(key, f"{prefix}/{key}")
+                    moved += 1
+                elif not storage.exists(f"{prefix}/{key}"):
+                    missing += 1
+
+            for picture in pictures:
+                picture.image_url = f"{prefix}/{original}"
+                if picture.variants:
+                    picture.variants = {
+                        size: key if '/' in key else f"{prefix}/{key}" for size, key in picture.variants.items()
+                    }
+                updated += 1
+            Blob.query.filter_by(key=original).update({Blob.key: f"{prefix}/{original}"})
+
+        db.session.commit()
+
+    return updated, moved, missing
+
+
+def _acquire(content_hash):
+    result = db.session.execute(
+        db.update(Blob).where(Blob.content_hash == content_hash).values(refcount=Blob.refcount + 1))
+    return result.rowcount > 0
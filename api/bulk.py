@@ -0,0 +1,43 @@
+from flask import current_app, request
+
+
+class BulkRequestError(ValueError):
+    """raised for a batch request body that is not a list of objects"""
+
+
+def is_id(value):
+    """whether a JSON value is an integer id; true and false are not"""
+    return isinstance(value, int) and not isinstance(value, bool)
+
+
+def read_batch(key):
+    """the list of item objects under key in the JSON body, within BULK_MAX_ITEMS"""
+    data = request.get_json(silent=True)
+    items = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(items, list) or not items:
+        raise BulkRequestError(f"Expected a non-empty '{key}' array")
+    if not all(isinstance(item, dict) for item in items):
+        raise BulkRequestError(f"Every item of '{key}' must be an object")
+    limit = current_app.config['BULK_MAX_ITEMS']
+    if len(items) > limit:
+        raise BulkRequestError(f"At most {limit} items are accepted per request")
+    return items
+
+
+def read_ids(key='ids'):
+    """the distinct integer ids listed under key in the JSON body, within BULK_MAX_ITEMS"""
+    data = request.get_json(silent=True)
+    ids = data.get(key) if isinstance(data, dict) else None
+    if not isinstance(ids, list) or not ids:
+        raise BulkRequestError(f"Expected a non-empty '{key}' array")
+    if not all(is_id(id_) for id_ in ids):
+        raise BulkRequestError(f"Every item of '{key}' must be an integer id")
+    limit = current_app.config['BULK_MAX_ITEMS']
+    if len(ids) > limit:
+        raise BulkRequestError(f"At most {limit} items are accepted per request")
+    return set(ids)
+
+
+def item_error(index, status, message):
+    """the result entry of an item that was rejected"""
+    return {"index": index, "status": status, "error": message}
@@ -0,0 +1,159 @@
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+
+@click.command('compact-blacklist')
+@click.option('--batch-size', type=int, default=None, help='Rows deleted per transaction.')
+@with_appcontext
+def compact_blacklist_command(batch_size):
+    """Delete token_blacklist rows whose tokens have already expired."""
+    from api.models.tokenblacklist import TokenBlacklist
+
+    batch_size = batch_size or current_app.config['BLACKLIST_COMPACT_BATCH_SIZE']
+    reclaimed = TokenBlacklist.purge_expired(batch_size=batch_size)
+    click.echo(f"Reclaimed {reclaimed} expired token_blacklist rows")
+
+
+@click.command('comments-recount')
+@click.option('--batch-size', type=int, default=1000, help='Pictures checked per transaction.')
+@with_appcontext
+def comments_recount_command(batch_size):
+    """Repair pictures whose comment_count disagrees with their comments."""
+    from api.models.picture import Picture
+
+    repaired = Picture.recount_comments(batch_size=batch_size)
+    click.echo(f"Repaired the comment count of {repaired} pictures")
+
+
+@click.command('search-backfill')
+@with_appcontext
+def search_backfill_command():
+    """Create the picture full-text index if needed and index existing rows."""
+    from api.search import rebuild_search_index
+
+    indexed = rebuild_search_index()
+    click.echo(f"Indexed {indexed} pictures")
+
+
+@click.command('jobs-resume')
+@with_appcontext
+def jobs_resume_command():
+    """Re-run durable jobs left pending by a stopped process, then wait for them."""
+    from api import jobs
+
+    resumed = jobs.resume()
+    jobs.drain()
+    stats = jobs.stats()
+    click.echo(f"Resumed {resumed} jobs: {stats['completed']} completed, {stats['failed']} failed")
+
+
+@click.command('storage-migrate')
+@click.argument('source')
+@click.argument('target')
+@with_appcontext
+def storage_migrate_command(source, target):
+    """Copy every stored picture file from the SOURCE backend to TARGET.
+
+    Backends are named as in STORAGE_BACKEND ('local' or 's3'). Files already
+    present in TARGET are skipped, so an interrupted run can be restarted.
+    Switch STORAGE_BACKEND to TARGET once it completes.
+    """
+    from contextlib import closing
+    from api.models.picture import Picture
+    from api.storage import create_backend
+
+    source_backend = create_backend(source, current_app.config)
+    target_backend = create_backend(target, current_app.config)
+
+    copied = skipped = missing = 0
+    seen = set()
+    rows = Picture.query.with_entities(Picture.image_url, Picture.variants).yield_per(1000)
+    for image_url, variants in rows:
+        for key in [image_url, *(variants or {}).values()]:
+            if key in seen:
+                continue
+            seen.add(key)
+            if target_backend.exists(key):
+                skipped += 1
+            elif not source_backend.exists(key):
+                missing += 1
+            else:
+                with closing(source_backend.open(key)) as fh:
+                    target_backend.put(key, fh)
+                copied += 1
+
+    click.echo(f"Copied {copied} files, {skipped} already present, {missing} missing from {source}")
+
+
+@click.command('storage-reshard')
+@click.option('--batch-size', type=int, default=500, help='Pictures rewritten per transaction.')
+@with_appcontext
+def storage_reshard_command(batch_size):
+    """Move files stored flat into the fan-out directory layout.
+
+    Safe to interrupt and run again; only pictures still in the flat layout
+    are touched.
+    """
+    from api.blobs import reshard_picture_files
+
+    depth = current_app.config['STORAGE_FANOUT_DEPTH']
+    if depth <= 0:
+        raise click.UsageError("STORAGE_FANOUT_DEPTH is 0, there is no layout to move to")
+
+    updated, moved, missing = reshard_picture_files(depth, batch_size=batch_size)
+    click.echo(f"Rewrote {updated} pictures, moved {moved} files, {missing} files missing")
+
+
+@click.command('explain-queries')
+@with_appcontext
+def explain_queries_command():
+    """Print the plans of the hot listing queries; fail if any reads a whole table.
+
+    Supported on SQLite and Postgres. Run it after schema changes to check
+    every listing is still served by an index, and every later page by an
+    index range starting at its cursor.
+    """
+    from api.queryplan import explain, full_scans, hot_queries
+
+    failures = 0
+    for name, query, seek in hot_queries():
+        plan = explain(query)
+        scans = full_scans(plan, seek)
+        failures += bool(scans)
+        click.echo(f"{'FULL SCAN' if scans else 'ok'}: {name}")
+        for line in plan:
+            click.echo(f"    {line}")
+        for problem in scans:
+            click.echo(f"    ! {problem}")
+
+    if failures:
+        raise click.ClickException(f"{failures} queries are not served by an index")
+
+
+@click.command('bcrypt-calibrate')
+@click.option('--target-ms', type=float, default=250, help='Longest acceptable time for one login.')
+@click.option('--min-cost', type=int, default=10, help='Lowest cost to consider.')
+@with_appcontext
+def bcrypt_calibrate_command(target_ms, min_cost):
+    """Time bcrypt on this machine and pick BCRYPT_LOG_ROUNDS for a target login latency."""
+    from api.passwords import calibrate
+
+    timings, chosen = calibrate(target_ms / 1000, min_cost=min_cost)
+    for cost, seconds in timings:
+        click.echo(f"cost {cost}: {seconds * 1000:.1f} ms per login, {1 / seconds:.1f} logins/sec/core")
+
+    click.echo(f"Recommended BCRYPT_LOG_ROUNDS={chosen} "
+               f"(currently {current_app.config['BCRYPT_LOG_ROUNDS']})")
+
+
+def register_commands(app):
+    """attach the iShare CLI commands to the flask command"""
+    app.cli.add_command(compact_blacklist_command)
+    app.cli.add_command(comments_recount_command)
+    app.cli.add_command(search_backfill_command)
+    app.cli.add_command(jobs_resume_command)
+    app.cli.add_command(storage_migrate_command)
+    app.cli.add_command(storage_reshard_command)
+    app.cli.add_command(explain_queries_command)
+    app.cli.add_command(bcrypt_calibrate_command)
@@ -10,3 +10,79 @@ class Config:
     # JWT Configuration
     JWT_SECRET_KEY = os.getenv('JWT_SECRET_KEY', 'jwt_secret_key')
     JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=1)
+    BLACKLIST_COMPACT_BATCH_SIZE = int(os.getenv('BLACKLIST_COMPACT_BATCH_SIZE', 1000))
+
+    # bcrypt work factor (log2 rounds) for password hashes; stored hashes with
+    # another cost are rehashed on the user's next login. Pick a value for the
+    # current hardware with 'flask bcrypt-calibrate'
+    BCRYPT_LOG_ROUNDS = int(os.getenv('BCRYPT_LOG_ROUNDS', 12))
+
+    # Threads that run bcrypt off the request threads (0 means one per CPU),
+    # how many more requests may wait for one, and the Retry-After sent with
+    # the 503 once that queue is full
+    PASSWORD_WORKERS = int(os.getenv('PASSWORD_WORKERS', 0))
+    PASSWORD_QUEUE_SIZE = int(os.getenv('PASSWORD_QUEUE_SIZE', 32))
+    PASSWORD_RETRY_AFTER = int(os.getenv('PASSWORD_RETRY_AFTER', 1))
+
+    # Throttling of login, registration and password reset (see api/ratelimit.py).
+    # Buckets live in each worker ('memory://') or are shared through Redis
+    RATELIMIT_ENABLED = os.getenv('RATELIMIT_ENABLED', 'true').lower() == 'true'
+    RATELIMIT_STORAGE_URL = os.getenv('RATELIMIT_STORAGE_URL', 'memory://')
+    RATELIMIT_PER_IP = os.getenv('RATELIMIT_PER_IP', '20/minute')
+    RATELIMIT_PER_ACCOUNT = os.getenv('RATELIMIT_PER_ACCOUNT', '5/minute')
+
+    # Keyset pagination for list endpoints
+    PAGE_SIZE_DEFAULT = int(os.getenv('PAGE_SIZE_DEFAULT', 20))
+    PAGE_SIZE_MAX = int(os.getenv('PAGE_SIZE_MAX', 100))
+
+    # Largest batch accepted by the bulk write endpoints
+    BULK_MAX_ITEMS = int(os.getenv('BULK_MAX_ITEMS', 500))
+
+    # Rows fetched per round-trip when streaming NDJSON exports
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+    # Where picture files are kept: 'local' (UPLOAD_FOLDER on this machine)
+    # or 's3' (any S3-compatible object store)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'local')
+    UPLOAD_FOLDER = os.getenv('UPLOAD_FOLDER', 'uploads')
+    S3_BUCKET = os.getenv('S3_BUCKET')
+    S3_ENDPOINT_URL = os.getenv('S3_ENDPOINT_URL')
+    S3_REGION = os.getenv('S3_REGION')
+    S3_ACCESS_KEY_ID = os.getenv('S3_ACCESS_KEY_ID')
+    S3_SECRET_ACCESS_KEY = os.getenv('S3_SECRET_ACCESS_KEY')
+    STORAGE_PRESIGN_EXPIRES = int(os.getenv('STORAGE_PRESIGN_EXPIRES', 3600))
+    # New files are stored under hashed fan-out directories, e.g. 'ab/cd/<name>'
+    STORAGE_FANOUT_DEPTH = int(os.getenv('STORAGE_FANOUT_DEPTH', 2))
+
+    # Uploads: the largest accepted picture, and the request body limit
+    # enforced by Flask before the multipart body is parsed
+    MAX_UPLOAD_SIZE = int(os.getenv('MAX_UPLOAD_SIZE', 16 * 1024 * 1024))
+    MAX_CONTENT_LENGTH = MAX_UPLOAD_SIZE + 64 * 1024
+
+    # Serving picture files: a year of client caching, optionally offloaded to
+    # the front-end server via X-Sendfile or nginx X-Accel-Redirect
+    PICTURE_FILE_MAX_AGE = int(os.getenv('PICTURE_FILE_MAX_AGE', 31536000))
+    USE_X_SENDFILE = os.getenv('USE_X_SENDFILE', 'false').lower() == 'true'
+    X_ACCEL_REDIRECT_PREFIX = os.getenv('X_ACCEL_REDIRECT_PREFIX')
+
+    # Home feed: how many recent pictures each worker keeps in memory, and how
+    # often it reloads them to pick up writes handled by other workers
+    FEED_SIZE = int(os.getenv('FEED_SIZE', 1000))
+    FEED_REFRESH_SECONDS = int(os.getenv('FEED_REFRESH_SECONDS', 60))
+
+    # Resized variants generated for every uploaded picture
+    THUMBNAIL_SIZES = (128, 512, 1024)
+    THUMBNAIL_FORMAT = os.getenv('THUMBNAIL_FORMAT', 'WEBP')  # WEBP or JPEG
+    THUMBNAIL_QUALITY = int(os.getenv('THUMBNAIL_QUALITY', 80))
+
+    # Background job queue (see api/jobs.py)
+    JOB_WORKERS = int(os.getenv('JOB_WORKERS', 4))
+    JOB_MAX_RETRIES = int(os.getenv('JOB_MAX_RETRIES', 3))
+    JOB_RETRY_BACKOFF = float(os.getenv('JOB_RETRY_BACKOFF', 1.0))
+    JOB_QUEUE_DURABLE = os.getenv('JOB_QUEUE_DURABLE', 'false').lower() == 'true'
+    JOB_SHUTDOWN_TIMEOUT = float(os.getenv('JOB_SHUTDOWN_TIMEOUT', 30))
+
+    # Token revocation cache (see api/revocation.py)
+    REVOCATION_REFRESH_SECONDS = int(os.getenv('REVOCATION_REFRESH_SECONDS', 30))
+    REVOCATION_BLOOM_CAPACITY = int(os.getenv('REVOCATION_BLOOM_CAPACITY', 100000))
+    REVOCATION_BLOOM_ERROR_RATE = float(os.getenv('REVOCATION_BLOOM_ERROR_RATE', 0.01))
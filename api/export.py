@@ -0,0 +1,27 @@
+from flask import current_app, request, stream_with_context
+
+
+NDJSON_MIMETYPE = 'application/x-ndjson'
+
+
+def wants_ndjson():
+    """check if the client asked for newline-delimited JSON"""
+    if request.args.get('format') == 'ndjson':
+        return True
+    return request.accept_mimetypes.best_match(['application/json', NDJSON_MIMETYPE]) == NDJSON_MIMETYPE
+
+
+def ndjson_response(query, serialize):
+    """stream query results as one JSON document per line
+
+    Rows are fetched in batches from a server-side cursor and written out as
+    they arrive, so memory stays flat and the first line is sent before the
+    query has been fully read.
+    """
+    batch_size = current_app.config['EXPORT_BATCH_SIZE']
+
+    def generate():
+        for row in query.yield_per(batch_size):
+            yield current_app.json.dumps(serialize(row)) + '\n'
+
+    return current_app.response_class(stream_with_context(generate()), mimetype=NDJSON_MIMETYPE)
@@ -0,0 +1,121 @@
+import bisect
+import threading
+import time
+from datetime import datetime
+
+
+def sort_key(created_at, picture_id):
+    """timeline position; pictures without a created_at sort oldest, as in paginate()"""
+    return (created_at or datetime.min, picture_id)
+
+
+class Timeline:
+    """in-process home feed of the most recent pictures
+
+    Keeps the newest FEED_SIZE pictures, each already serialized together
+    with its author's username, so a feed page is a slice of memory rather
+    than a join. The timeline is built from the database on first use,
+    patched in place by the writes this worker handles, and rebuilt every
+    FEED_REFRESH_SECONDS to pick up writes made by other workers.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._keys = None  # sort keys, oldest first
+        self._entries = {}  # picture id -> serialized entry
+        self._last_rebuild = 0.0
+        self.size = 1000
+        self.refresh_interval = 60
+        self.rebuilds = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.size = app.config.get('FEED_SIZE', self.size)
+        self.refresh_interval = app.config.get('FEED_REFRESH_SECONDS', self.refresh_interval)
+        app.extensions['feed'] = self
+
+    def page(self, after=None, limit=20):
+        """up to limit entries older than the after sort key, plus whether more follow"""
+        with self._lock:
+            # Checked under the same lock as the read, so a concurrent reset()
+            # cannot leave the timeline empty in between
+            if self._stale():
+                self._rebuild()
+            end = len(self._keys) if after is None else bisect.bisect_left(self._keys, after)
+            keys = self._keys[max(end - limit - 1, 0):end]
+            entries = [self._entries[key[1]] for key in reversed(keys)]
+        return entries[:limit], len(entries) > limit
+
+    def add(self, picture, username):
+        """insert or replace a picture after it is created or edited"""
+        from api.serializers import picture_serializer
+
+        entry = picture_serializer(picture)
+        with self._lock:
+            if self._keys is None:
+                return
+            old = self._entries.get(picture.id)
+            entry['username'] = username
+            if old:
+                self._keys.remove(sort_key(old['created_at'], old['id']))
+            key = sort_key(entry['created_at'], entry['id'])
+            if len(self._keys) >= self.size and key < self._keys[0]:
+                # Older than everything kept
+                self._entries.pop(picture.id, None)
+                return
+            bisect.insort(self._keys, key)
+            self._entries[picture.id] = entry
+            while len(self._keys) > self.size:
+                self._entries.pop(self._keys.pop(0)[1], None)
+
+    def remove(self, picture_id):
+        """drop a deleted picture"""
+        with self._lock:
+            entry = self._entries.pop(picture_id, None) if self._keys is not None else None
+            if entry:
+                self._keys.remove(sort_key(entry['created_at'], entry['id']))
+
+    def count_comments(self, picture_id, delta):
+        """adjust a picture's comment count after comments are added or removed"""
+        with self._lock:
+            entry = self._entries.get(picture_id)
+            if entry:
+                entry['comment_count'] = max(entry['comment_count'] + delta, 0)
+
+    def reset(self):
+        """drop the timeline so the next read rebuilds it, e.g. after bulk changes"""
+        with self._lock:
+            self._keys = None
+            self._entries = {}
+
+    def stats(self):
+        """timeline occupancy and rebuild counter"""
+        return {
+            "entries": len(self._entries),
+            "size": self.size,
+            "rebuilds": self.rebuilds,
+        }
+
+    def _stale(self):
+        return self._keys is None or time.monotonic() - self._last_rebuild >= self.refresh_interval
+
+    def _rebuild(self):
+        from api.models.picture import Picture
+        from api.models.user import User
+        from api.pagination import page_query
+        from api.serializers import picture_serializer
+
+        query = picture_serializer.project(Picture.query, Picture).join(User, User.id == Picture.user_id)
+        rows = page_query(query.add_columns(User.username), Picture, limit=self.size).all()
+
+        entries = {}
+        for row in rows:
+            entry = picture_serializer(row)
+            entry['username'] = row.username
+            entries[row.id] = entry
+
+        self._entries = entries
+        self._keys = sorted(sort_key(entry['created_at'], entry['id']) for entry in entries.values())
+        self._last_rebuild = time.monotonic()
+        self.rebuilds += 1
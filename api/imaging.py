@@ -0,0 +1,70 @@
+import io
+import os
+from flask import current_app
+from PIL import Image, ImageOps
+
+
+FORMAT_EXTENSIONS = {'WEBP': 'webp', 'JPEG': 'jpg'}
+
+
+def variant_key(key, size, image_format):
+    """storage key of the resized copy of key at the given size"""
+    base, _ = os.path.splitext(key)
+    return f"{base}_{size}.{FORMAT_EXTENSIONS[image_format]}"
+
+
+def generate_variants(key, sizes, image_format):
+    """store a downscaled copy of the image at key for every size; returns {size: key}"""
+    from api import storage
+
+    variants = {}
+    with Image.open(io.BytesIO(storage.get(key))) as original:
+        original = ImageOps.exif_transpose(original)
+        if image_format == 'JPEG' and original.mode not in ('RGB', 'L'):
+            original = original.convert('RGB')
+        for size in sizes:
+            image = original.copy()
+            # thumbnail() keeps the aspect ratio and never upscales
+            image.thumbnail((size, size), Image.LANCZOS)
+            buffer = io.BytesIO()
+            image.save(buffer, image_format, quality=current_app.config['THUMBNAIL_QUALITY'])
+            buffer.seek(0)
+            variant = variant_key(key, size, image_format)
+            storage.put(variant, buffer)
+            variants[str(size)] = variant
+    return variants
+
+
+def create_picture_variants(picture_id):
+    """generate and record the resized variants of a stored picture
+
+    Runs on the job queue; safe to repeat since variants are simply rewritten.
+    """
+    from api import db, feed
+    from api.models.picture import Picture
+
+    picture = db.session.get(Picture, picture_id)
+    if not picture:
+        return
+
+    # Pictures sharing stored content share its variants too
+    if picture.content_hash:
+        sibling = Picture.query.filter(
+            Picture.content_hash == picture.content_hash,
+            Picture.id != picture.id,
+            Picture.variants.isnot(None),
+        ).first()
+        if sibling:
+            picture.variants = sibling.variants
+            db.session.commit()
+            feed.add(picture, picture.user.username)
+            return
+
+    picture.variants = generate_variants(
+        picture.image_url,
+        current_app.config['THUMBNAIL_SIZES'],
+        current_app.config['THUMBNAIL_FORMAT'],
+    )
+    db.session.commit()
+    feed.add(picture, picture.user.username)
+
@@ -0,0 +1,181 @@
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+
+class JobQueue:
+    """small in-process job queue backed by a thread pool
+
+    Handlers are registered with the task() decorator and must be idempotent:
+    a failing job is retried with exponential backoff, and with
+    JOB_QUEUE_DURABLE enabled every job is also written to the jobs table so
+    work interrupted by a restart can be replayed with 'flask jobs-resume'.
+    """
+
+    def __init__(self, app=None):
+        self.handlers = {}
+        self.app = None
+        self._executor = None
+        self._cond = threading.Condition()
+        self._outstanding = 0
+        self._running = 0
+        self._closed = False
+        self.enqueued = 0
+        self.completed = 0
+        self.retried = 0
+        self.failed = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_workers = app.config.get('JOB_WORKERS', 4)
+        self.max_retries = app.config.get('JOB_MAX_RETRIES', 3)
+        self.retry_backoff = app.config.get('JOB_RETRY_BACKOFF', 1.0)
+        self.durable = app.config.get('JOB_QUEUE_DURABLE', False)
+        self.shutdown_timeout = app.config.get('JOB_SHUTDOWN_TIMEOUT', 30)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='jobs')
+            # concurrent.futures stops accepting work before atexit handlers run,
+            # so drain from the earlier threading hook where CPython has one
+            register = getattr(threading, '_register_atexit', atexit.register)
+            register(self._shutdown)
+        app.extensions['jobs'] = self
+
+    def task(self, name=None):
+        """register a function as the handler for jobs called name"""
+        def decorator(f):
+            self.handlers[name or f.__name__] = f
+            return f
+        return decorator
+
+    def enqueue(self, name, **payload):
+        """schedule handler name to run with payload as keyword arguments"""
+        if name not in self.handlers:
+            raise KeyError(f"No job handler registered for {name!r}")
+
+        job_id = None
+        if self.durable:
+            from api import db
+            from api.models.job import Job
+
+            job = Job(name=name, payload=payload)
+            db.session.add(job)
+            db.session.commit()
+            job_id = job.id
+
+        self._submit(name, payload, job_id, attempt=0)
+        self.enqueued += 1
+        return job_id
+
+    def resume(self):
+        """resubmit durable jobs left pending by a previous process"""
+        from api.models.job import Job
+
+        jobs = Job.query.filter_by(status='pending').order_by(Job.id).all()
+        for job in jobs:
+            self._submit(job.name, job.payload, job.id, attempt=job.attempts)
+        return len(jobs)
+
+    def drain(self, timeout=None):
+        """stop accepting jobs and wait for queued and running ones to finish"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self._closed = True
+            while self._outstanding:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._cond.wait(remaining)
+        return True
+
+    def _shutdown(self):
+        if not self.drain(self.shutdown_timeout):
+            self.app.logger.warning("Exiting with %d background jobs unfinished", self._outstanding)
+
+    def stats(self):
+        """queue depth and lifetime counters"""
+        with self._cond:
+            return {
+                "depth": self._outstanding - self._running,
+                "running": self._running,
+                "workers": self.max_workers,
+                "enqueued": self.enqueued,
+                "completed": self.completed,
+                "retried": self.retried,
+                "failed": self.failed,
+            }
+
+    def _submit(self, name, payload, job_id, attempt, delay=0):
+        with self._cond:
+            # Retries of accepted jobs still run while draining
+            if self._closed and not attempt:
+                raise RuntimeError("Job queue is shutting down")
+            self._outstanding += 1
+
+        if delay:
+            timer = threading.Timer(delay, self._submit_delayed, (name, payload, job_id, attempt))
+            timer.daemon = True
+            timer.start()
+        else:
+            self._executor.submit(self._run, name, payload, job_id, attempt)
+
+    def _submit_delayed(self, name, payload, job_id, attempt):
+        try:
+            self._executor.submit(self._run, name, payload, job_id, attempt)
+        except RuntimeError:
+            # The executor shut down while the retry waited; a durable job
+            # stays pending in the jobs table for 'flask jobs-resume'
+            with self._cond:
+                self._outstanding -= 1
+                self._cond.notify_all()
+
+    def _run(self, name, payload, job_id, attempt):
+        with self._cond:
+            self._running += 1
+        try:
+            with self.app.app_context():
+                try:
+                    self.handlers[name](**payload)
+                except Exception as err:
+                    self._handle_failure(name, payload, job_id, attempt, err)
+                else:
+                    self.completed += 1
+                    self._record(job_id, 'done', attempt + 1)
+        finally:
+            with self._cond:
+                self._running -= 1
+                self._outstanding -= 1
+                self._cond.notify_all()
+
+    def _handle_failure(self, name, payload, job_id, attempt, err):
+        from api import db
+
+        db.session.rollback()
+        if attempt < self.max_retries:
+            self.retried += 1
+            self._record(job_id, 'pending', attempt + 1, err)
+            self._submit(name, payload, job_id, attempt + 1, delay=self.retry_backoff * 2 ** attempt)
+            return
+
+        self.failed += 1
+        self._record(job_id, 'failed', attempt + 1, err)
+        self.app.logger.exception("Job %s failed after %d attempts", name, attempt + 1)
+
+    def _record(self, job_id, status, attempts, err=None):
+        if job_id is None:
+            return
+        from api import db
+        from api.models.job import Job
+
+        job = db.session.get(Job, job_id)
+        if not job:
+            return
+        if status == 'done':
+            db.session.delete(job)
+        else:
+            job.status = status
+            job.attempts = attempts
+            job.last_error = repr(err) if err else None
+        db.session.commit()
@@ -1,3 +1,5 @@
 from .user import User
 from .picture import Picture
 from .comment import Comment
+from .blob import Blob
+from .job import Job
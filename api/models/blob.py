@@ -0,0 +1,16 @@
+from api import db
+from sqlalchemy.sql import func
+
+
+class Blob(db.Model):
+    """a stored file shared by every picture with the same content"""
+    __tablename__ = 'blobs'
+
+    content_hash = db.Column(db.String(64), primary_key=True)
+    key = db.Column(db.String, nullable=False, index=True)
+    size = db.Column(db.Integer, nullable=False)
+    refcount = db.Column(db.Integer, default=0, nullable=False)
+    created_at = db.Column(db.DateTime, default=func.now())
+
+    def __repr__(self):
+        return f'<Blob {self.content_hash}>'
@@ -1,9 +1,14 @@
 from api import db
+from api.pagination import NEWEST_FIRST
 from sqlalchemy.sql import func
 
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (
+        db.Index('ix_comments_picture_id_created_at', 'picture_id', 'created_at', 'id', **NEWEST_FIRST),
+        db.Index('ix_comments_user_id_created_at', 'user_id', 'created_at', 'id', **NEWEST_FIRST),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -1,16 +1,58 @@
 from api import db
+from api.pagination import NEWEST_FIRST
+from sqlalchemy import select
 from sqlalchemy.sql import func
 
 
 class Picture(db.Model):
     __tablename__ = 'pictures'
+    __table_args__ = (
+        db.Index('ix_pictures_user_id_created_at', 'user_id', 'created_at', 'id', **NEWEST_FIRST),
+        db.Index('ix_pictures_created_at', 'created_at', 'id', **NEWEST_FIRST),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     image_url = db.Column(db.String, nullable=False)
     description = db.Column(db.String)
+    variants = db.Column(db.JSON)
+    content_hash = db.Column(db.String(64), index=True)
+    # Kept in step with the comments table by every write path; see recount_comments()
+    comment_count = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     created_at = db.Column(db.DateTime, default=func.now())
     updated_at = db.Column(db.DateTime, default=func.now(), onupdate=func.now())
 
     user = db.relationship('User', back_populates='pictures', lazy=True)
     comments = db.relationship('Comment', back_populates='picture', lazy=True, cascade='all, delete-orphan')
+
+    @classmethod
+    def uncount_comments_by(cls, *user_ids):
+        """subtract users' comments from the counts of the pictures they commented on
+
+        Call before deleting the users, in the same transaction.
+        """
+        from api.models.comment import Comment
+
+        theirs = select(func.count(Comment.id)).where(
+            Comment.picture_id == cls.id, Comment.user_id.in_(user_ids)).scalar_subquery()
+        commented = select(Comment.picture_id).where(Comment.user_id.in_(user_ids))
+        db.session.query(cls).filter(cls.id.in_(commented)).update(
+            {cls.comment_count: cls.comment_count - theirs}, synchronize_session=False)
+
+    @classmethod
+    def recount_comments(cls, batch_size=1000):
+        """repair comment_count drift from the comments table, in batches; returns rows fixed"""
+        from api.models.comment import Comment
+
+        actual = select(func.count(Comment.id)).where(Comment.picture_id == cls.id).scalar_subquery()
+        repaired = 0
+        last_id = 0
+        while True:
+            ids = [row.id for row in db.session.query(cls.id).filter(cls.id > last_id).order_by(cls.id).limit(batch_size)]
+            if not ids:
+                break
+            repaired += db.session.query(cls).filter(cls.id.in_(ids), cls.comment_count != actual).update(
+                {cls.comment_count: actual}, synchronize_session=False)
+            db.session.commit()
+            last_id = ids[-1]
+        return repaired
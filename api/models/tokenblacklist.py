@@ -1,11 +1,37 @@
 from api import db
 from datetime import datetime, timezone
+from flask import current_app
+from sqlalchemy import and_, or_
 
 
 class TokenBlacklist(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     jti = db.Column(db.String(40), nullable=False, unique=True)
-    created_at = db.Column(db.DateTime, nullable=False, default=datetime.now(timezone.utc))
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc), index=True)
+    expires_at = db.Column(db.DateTime, index=True)
 
     def __repr__(self):
         return f'<TokenBlacklist {self.jti}>'
+
+    @classmethod
+    def purge_expired(cls, batch_size=1000, now=None):
+        """delete rows whose token has expired, in short batches; returns rows removed"""
+        now = now or datetime.now(timezone.utc)
+        # Rows written before expires_at existed expire one token lifetime after creation
+        legacy_cutoff = now - current_app.config['JWT_ACCESS_TOKEN_EXPIRES']
+        expired = or_(
+            cls.expires_at < now,
+            and_(cls.expires_at.is_(None), cls.created_at < legacy_cutoff),
+        )
+
+        reclaimed = 0
+        while True:
+            ids = [row.id for row in db.session.query(cls.id).filter(expired).limit(batch_size)]
+            if not ids:
+                break
+            # Each batch is its own short transaction so writers are never blocked for long
+            db.session.query(cls).filter(cls.id.in_(ids)).delete(synchronize_session=False)
+            db.session.commit()
+            reclaimed += len(ids)
+
+        return reclaimed
@@ -1,16 +1,24 @@
 #!/usr/bin/env python3
-from api import db, bcrypt
+from flask import current_app
+from api import db, password_pool
+from api.passwords import hash_cost
+from api.pagination import NEWEST_FIRST
 from sqlalchemy.sql import func
 
 
 class User(db.Model):
     __tablename__ = 'users'
+    __table_args__ = (
+        db.Index('ix_users_created_at', 'created_at', 'id', **NEWEST_FIRST),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(80), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
     password_hash = db.Column(db.String(128), nullable=False)
     role = db.Column(db.String(20), default='user', nullable=False)
+    # Bumped whenever the role changes, so tokens carrying the old role claim stop working
+    token_version = db.Column(db.Integer, default=0, server_default='0', nullable=False)
     created_at = db.Column(db.DateTime, default=func.now())
     updated_at = db.Column(db.DateTime, default=func.now(), onupdate=func.now())
 
@@ -22,8 +30,12 @@ class User(db.Model):
 
     def set_password(self, password):
         """hash a user's pwd"""
-        self.password_hash = bcrypt.generate_password_hash(password).decode('utf-8')
+        self.password_hash = password_pool.hash(password)
 
     def check_password(self, password):
         """check plain pwd against hashed pwd"""
-        return bcrypt.check_password_hash(self.password_hash, password)
+        return password_pool.check(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        """whether the stored hash was made with a cost other than BCRYPT_LOG_ROUNDS"""
+        return hash_cost(self.password_hash) != current_app.config['BCRYPT_LOG_ROUNDS']
@@ -0,0 +1,117 @@
+import base64
+import json
+from datetime import datetime
+from flask import current_app, request
+from sqlalchemy import String, tuple_, type_coerce
+from api import db
+
+
+# Postgres sorts NULLs first in a descending index unless told otherwise; index
+# options that make a (..., created_at, id) index match paginate()'s ORDER BY
+# (SQLite already sorts NULLs last when descending, and ignores these)
+NEWEST_FIRST = {'postgresql_ops': {'created_at': 'DESC NULLS LAST', 'id': 'DESC'}}
+
+
+class PaginationError(ValueError):
+    """raised for a malformed limit or cursor query parameter"""
+
+
+def encode_cursor(*values):
+    """pack the sort key of the last row into an opaque url-safe token"""
+    payload = [value.isoformat() if isinstance(value, datetime) else value for value in values]
+    raw = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(cursor):
+    """unpack a token produced by encode_cursor"""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+    if not isinstance(values, list):
+        raise PaginationError("Invalid cursor")
+    return values
+
+
+def get_limit():
+    """read and clamp the limit query parameter"""
+    default = current_app.config['PAGE_SIZE_DEFAULT']
+    maximum = current_app.config['PAGE_SIZE_MAX']
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        raise PaginationError("limit must be an integer")
+    if limit < 1:
+        raise PaginationError("limit must be positive")
+    return min(limit, maximum)
+
+
+def cursor_datetime(value):
+    """bind a cursor timestamp so it compares correctly with stored values"""
+    if db.engine.dialect.name == 'sqlite' and value.microsecond == 0:
+        # func.now() defaults are stored by SQLite without fractional seconds,
+        # and SQLite compares datetimes as text.
+        return type_coerce(value.strftime('%Y-%m-%d %H:%M:%S'), String)
+    return value
+
+
+def parse_cursor(cursor):
+    """the (created_at, id) sort key packed into a cursor; created_at may be None"""
+    try:
+        created_at, last_id = decode_cursor(cursor)
+        last_id = int(last_id)
+        if created_at is not None:
+            created_at = cursor_datetime(datetime.fromisoformat(created_at))
+    except (ValueError, TypeError):
+        raise PaginationError("Invalid cursor")
+    return created_at, last_id
+
+
+def page_query(query, model, cursor=None, limit=None):
+    """restrict query to the page after cursor, ordered newest first
+
+    A dated cursor seeks on the (created_at, id) row value, which the index
+    serves as a range, and so stops at the last dated row; the undated rows
+    that sort after it come from null_tail().
+    """
+    if cursor:
+        created_at, last_id = parse_cursor(cursor)
+        # Rows without a created_at sort last, ordered by id alone
+        if created_at is None:
+            query = query.filter(model.created_at.is_(None), model.id < last_id)
+        else:
+            query = query.filter(tuple_(model.created_at, model.id) < tuple_(created_at, last_id))
+
+    query = query.order_by(model.created_at.desc().nulls_last(), model.id.desc())
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+
+def null_tail(query, model, limit):
+    """the first rows of query without a created_at, which sort after all dated rows"""
+    return query.filter(model.created_at.is_(None)).order_by(model.id.desc()).limit(limit)
+
+
+def paginate(query, model):
+    """return one page of query ordered newest first, plus the next cursor
+
+    Pages are addressed by the (created_at, id) of the last row seen rather
+    than an OFFSET, so every page costs the same index range scan no matter
+    how deep the client has paged.
+    """
+    limit = get_limit()
+    cursor = request.args.get('cursor')
+    rows = page_query(query, model, cursor, limit + 1).all()
+    if cursor and len(rows) <= limit and parse_cursor(cursor)[0] is not None:
+        # The seek ran out of dated rows; continue into the undated ones
+        rows += null_tail(query, model, limit + 1 - len(rows)).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].created_at, rows[-1].id)
+
+    return rows, next_cursor
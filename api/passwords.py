@@ -0,0 +1,136 @@
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import bcrypt as _bcrypt
+
+
+def hash_cost(password_hash):
+    """the work factor of a bcrypt hash, e.g. 12 for '$2b$12$...'"""
+    try:
+        return int(password_hash.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+def time_check(cost, min_seconds=1.0, min_samples=3):
+    """average seconds one password check takes at cost on this machine"""
+    password = b'calibration-password'
+    hashed = _bcrypt.hashpw(password, _bcrypt.gensalt(rounds=cost))
+    samples = 0
+    start = time.perf_counter()
+    while samples < min_samples or time.perf_counter() - start < min_seconds:
+        _bcrypt.checkpw(password, hashed)
+        samples += 1
+    return (time.perf_counter() - start) / samples
+
+
+def calibrate(target_seconds, min_cost=4, max_cost=31):
+    """time each cost from min_cost up; returns ([(cost, seconds)], chosen cost)
+
+    The chosen cost is the highest whose check stays within target_seconds,
+    or min_cost if none does. Timing stops at the first cost over the target,
+    since every further cost doubles the work.
+    """
+    timings = []
+    chosen = min_cost
+    for cost in range(min_cost, max_cost + 1):
+        seconds = time_check(cost)
+        timings.append((cost, seconds))
+        if seconds > target_seconds:
+            break
+        chosen = cost
+    return timings, chosen
+
+
+class PasswordPoolBusy(Exception):
+    """raised when every password worker is busy and the wait queue is full"""
+
+    def __init__(self, retry_after):
+        super().__init__("Password hashing pool is saturated")
+        self.retry_after = retry_after
+
+
+class PasswordPool:
+    """bounded thread pool that runs bcrypt off the request threads
+
+    bcrypt releases the GIL, so PASSWORD_WORKERS threads hash in parallel
+    while at most PASSWORD_QUEUE_SIZE further requests wait their turn.
+    Anything beyond that is shed immediately with PasswordPoolBusy instead
+    of tying up a web worker, keeping cheap endpoints responsive during
+    login bursts.
+    """
+
+    def __init__(self, app=None):
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._running = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.max_workers = app.config.get('PASSWORD_WORKERS') or os.cpu_count() or 1
+        self.queue_size = app.config.get('PASSWORD_QUEUE_SIZE', 32)
+        self.retry_after = app.config.get('PASSWORD_RETRY_AFTER', 1)
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='passwords')
+            self._slots = threading.BoundedSemaphore(self.max_workers + self.queue_size)
+        app.extensions['password_pool'] = self
+
+    def hash(self, password):
+        """bcrypt hash of password at the configured cost"""
+        from api import bcrypt
+        return self._run(bcrypt.generate_password_hash, password).decode('utf-8')
+
+    def check(self, password_hash, password):
+        """whether password matches password_hash"""
+        from api import bcrypt
+        return self._run(bcrypt.check_password_hash, password_hash, password)
+
+    def stats(self):
+        """pool utilization and queue wait times"""
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "busy": self._running,
+                "queued": self._in_flight - self._running,
+                "queue_size": self.queue_size,
+                "utilization": self._running / self.max_workers,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_wait_ms": 1000 * self.wait_seconds / self.completed if self.completed else 0.0,
+                "max_wait_ms": 1000 * self.max_wait_seconds,
+            }
+
+    def _run(self, f, *args):
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            raise PasswordPoolBusy(self.retry_after)
+        with self._lock:
+            self._in_flight += 1
+        try:
+            return self._executor.submit(self._call, time.monotonic(), f, *args).result()
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+            self._slots.release()
+
+    def _call(self, queued_at, f, *args):
+        waited = time.monotonic() - queued_at
+        with self._lock:
+            self._running += 1
+            self.wait_seconds += waited
+            self.max_wait_seconds = max(self.max_wait_seconds, waited)
+        try:
+            return f(*args)
+        finally:
+            with self._lock:
+                self._running -= 1
+                self.completed += 1
@@ -0,0 +1,81 @@
+import re
+from datetime import datetime
+from api import db
+from api.pagination import encode_cursor, page_query
+
+
+# SQLite: a table read without an index, or a sort the index could not provide
+SQLITE_FULL_SCAN = re.compile(r'^SCAN \w+$|USE TEMP B-TREE FOR ORDER BY')
+# Postgres: a sequential scan or an explicit sort node
+POSTGRES_FULL_SCAN = re.compile(r'Seq Scan|^\s*(->\s*)?(Incremental )?Sort\b')
+
+# A cursor page must start its index read at the cursor: SQLite searches the
+# index on created_at and never walks it from one end, Postgres puts
+# created_at in the index condition
+SQLITE_INDEX_WALK = re.compile(r'^SCAN ')
+SQLITE_SEEK = re.compile(r'^SEARCH .*\bcreated_at<')
+POSTGRES_SEEK = re.compile(r'Index Cond: .*created_at')
+
+
+def hot_queries():
+    """the listing queries served on every request, as (name, query, seek) triples
+
+    Each listing is checked on its first page and on a later page, since a
+    cursor adds a range condition the index has to serve as well; seek is
+    true for the later pages.
+    """
+    from api.models.comment import Comment
+    from api.models.picture import Picture
+    from api.models.user import User
+
+    listings = [
+        ('comments by picture', Comment.query.filter_by(picture_id=1), Comment),
+        ('comments by user', Comment.query.filter_by(user_id=1), Comment),
+        ('pictures by user', Picture.query.filter_by(user_id=1), Picture),
+        ('all pictures', Picture.query, Picture),
+        ('all users', User.query, User),
+    ]
+    cursor = encode_cursor(datetime(2024, 1, 1, 12, 0, 0), 1000)
+    queries = []
+    for name, query, model in listings:
+        queries.append((name, page_query(query, model, limit=21), False))
+        queries.append((f"{name}, later page", page_query(query, model, cursor, limit=21), True))
+    return queries
+
+
+def explain(query):
+    """the database's plan for query, one line per step"""
+    dialect = db.engine.dialect.name
+    compiled = query.statement.compile(db.engine)
+    params = compiled.params
+    if compiled.positional:
+        params = tuple(params[name] for name in compiled.positiontup)
+    connection = db.session.connection()
+
+    if dialect == 'sqlite':
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {compiled}", params).all()
+        return [row[-1] for row in rows]
+    if dialect == 'postgresql':
+        # Tiny tables are cheaper to scan, so ask whether an index can be used at all
+        connection.exec_driver_sql("SET LOCAL enable_seqscan = off")
+        rows = connection.exec_driver_sql(f"EXPLAIN {compiled}", params).all()
+        db.session.rollback()
+        return [row[0] for row in rows]
+    raise RuntimeError(f"Query plans are not supported on {dialect}")
+
+
+def full_scans(plan, seek=False):
+    """the problems in plan: lines that read a whole table or sort outside an index
+
+    With seek, a plan that does not bound its index read by the cursor is
+    reported as well, since its cost grows with the depth of the page.
+    """
+    sqlite = db.engine.dialect.name == 'sqlite'
+    pattern = SQLITE_FULL_SCAN if sqlite else POSTGRES_FULL_SCAN
+    problems = [line for line in plan if pattern.search(line)]
+    if seek:
+        if sqlite:
+            problems += [line for line in plan if SQLITE_INDEX_WALK.search(line) and line not in problems]
+        if not any((SQLITE_SEEK if sqlite else POSTGRES_SEEK).search(line) for line in plan):
+            problems.append("no index range on the cursor")
+    return problems
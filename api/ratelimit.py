@@ -0,0 +1,156 @@
+import math
+import re
+import threading
+import time
+from functools import wraps
+from flask import current_app, request
+
+try:
+    import redis
+except ImportError:  # redis is only needed for a shared rate limit store
+    redis = None
+
+
+PERIODS = {'second': 1, 'minute': 60, 'hour': 3600, 'day': 86400}
+
+
+class RateLimitExceeded(Exception):
+    """raised when a request is over one of its rate limits"""
+
+    def __init__(self, retry_after):
+        super().__init__("Rate limit exceeded")
+        self.retry_after = retry_after
+
+
+def parse_rate(rate):
+    """'5/minute' -> (capacity 5, refill rate in tokens per second)"""
+    match = re.fullmatch(r'\s*(\d+)\s*/\s*(second|minute|hour|day)\s*', rate)
+    if not match:
+        raise ValueError(f"Invalid rate limit {rate!r}, expected e.g. '5/minute'")
+    capacity = int(match.group(1))
+    return capacity, capacity / PERIODS[match.group(2)]
+
+
+class MemoryStore:
+    """token buckets kept in this process; limits are per worker"""
+
+    def __init__(self, max_keys=100000):
+        self.max_keys = max_keys
+        self._buckets = {}
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, rate):
+        """take one token from bucket key; returns seconds to wait, 0 if allowed"""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - updated) * rate)
+            if tokens >= 1:
+                self._buckets[key] = (tokens - 1, now)
+                wait = 0
+            else:
+                self._buckets[key] = (tokens, now)
+                wait = (1 - tokens) / rate
+            if len(self._buckets) > self.max_keys:
+                self._prune(now, capacity, rate)
+        return wait
+
+    def _prune(self, now, capacity, rate):
+        # A bucket that has refilled completely is the same as no bucket
+        full_after = capacity / rate
+        self._buckets = {key: value for key, value in self._buckets.items() if now - value[1] < full_after}
+
+
+class RedisStore:
+    """token buckets shared by every worker through a Redis server
+
+    Takes any client speaking the Redis protocol, so tests can pass a fake one.
+    """
+
+    SCRIPT = """
+        local capacity = tonumber(ARGV[1])
+        local rate = tonumber(ARGV[2])
+        local clock = redis.call('TIME')
+        local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+        local state = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+        local tokens = tonumber(state[1]) or capacity
+        local updated = tonumber(state[2]) or now
+        tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+        local wait = 0
+        if tokens >= 1 then
+            tokens = tokens - 1
+        else
+            wait = (1 - tokens) / rate
+        end
+        redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+        redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+        return tostring(wait)
+    """
+
+    def __init__(self, client, prefix='ratelimit:'):
+        self.client = client
+        self.prefix = prefix
+        self._script = client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, rate):
+        return float(self._script(keys=[self.prefix + key], args=[capacity, rate]))
+
+
+def create_store(url):
+    """build the store for RATELIMIT_STORAGE_URL: 'memory://' or a redis:// URL"""
+    if url == 'memory://':
+        return MemoryStore()
+    if url.startswith(('redis://', 'rediss://', 'unix://')):
+        if redis is None:
+            raise RuntimeError("A redis rate limit store requires the redis package")
+        return RedisStore(redis.Redis.from_url(url))
+    raise ValueError(f"Unknown rate limit store {url!r}")
+
+
+class RateLimiter:
+    """flask extension throttling sensitive endpoints with token buckets
+
+    Each limited endpoint gets one bucket per client IP and, when the request
+    names an account, one per account, so credential stuffing is slowed both
+    from a single address and across many addresses aimed at one account.
+    Limits are checked before the handler runs, so a rejected request costs
+    no database or bcrypt work.
+    """
+
+    def __init__(self, app=None):
+        self.store = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = app.config.get('RATELIMIT_ENABLED', True)
+        self.store = create_store(app.config.get('RATELIMIT_STORAGE_URL', 'memory://'))
+        self.ip_rate = parse_rate(app.config.get('RATELIMIT_PER_IP', '20/minute'))
+        self.account_rate = parse_rate(app.config.get('RATELIMIT_PER_ACCOUNT', '5/minute'))
+        app.extensions['ratelimit'] = self
+
+    def limit(self, account_field=None):
+        """decorator limiting an endpoint per IP and per the account named by account_field"""
+        def decorator(f):
+            @wraps(f)
+            def decorated_function(*args, **kwargs):
+                if self.enabled:
+                    self.check(account_field)
+                return f(*args, **kwargs)
+            return decorated_function
+        return decorator
+
+    def check(self, account_field=None):
+        """take a token from the current request's buckets; raise if any is empty"""
+        scope = request.endpoint
+        buckets = [(f"{scope}:ip:{request.remote_addr}", self.ip_rate)]
+        if account_field:
+            data = request.get_json(silent=True)
+            account = data.get(account_field) if isinstance(data, dict) else None
+            if isinstance(account, str) and account:
+                buckets.append((f"{scope}:account:{account.strip().lower()}", self.account_rate))
+
+        wait = max(self.store.take(key, *rate) for key, rate in buckets)
+        if wait:
+            current_app.logger.info("Rate limited %s from %s", scope, request.remote_addr)
+            raise RateLimitExceeded(math.ceil(wait))
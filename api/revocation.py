@@ -0,0 +1,142 @@
+import hashlib
+import math
+import threading
+import time
+from datetime import timedelta
+
+
+class BloomFilter:
+    """compact probabilistic set: no false negatives, tunable false positives"""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(int(-self.capacity * math.log(error_rate) / (math.log(2) ** 2)), 8)
+        self.num_hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.num_hashes)]
+
+    def add(self, key):
+        """add a key, returns False if it was (probably) already present"""
+        added = False
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                self.bits[byte] |= 1 << bit
+                added = True
+        if added:
+            self.count += 1
+        return added
+
+    def __contains__(self, key):
+        for pos in self._positions(key):
+            byte, bit = divmod(pos, 8)
+            if not self.bits[byte] & (1 << bit):
+                return False
+        return True
+
+
+class RevocationCache:
+    """in-process cache of revoked JWT ids sitting in front of TokenBlacklist
+
+    A miss in the bloom filter means the token is definitely not revoked and
+    is answered without touching the database. A (possible) hit falls through
+    to the TokenBlacklist table. The filter is loaded on first use and then
+    refreshed incrementally from rows newer than the created_at watermark, so
+    logouts handled by other workers propagate within REVOCATION_REFRESH_SECONDS.
+    """
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._bloom = None
+        self._watermark = None
+        self._last_refresh = 0.0
+        self.refresh_interval = 30
+        self.capacity = 100000
+        self.error_rate = 0.01
+        self.hits = 0
+        self.misses = 0
+        self.refreshes = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.refresh_interval = app.config.get('REVOCATION_REFRESH_SECONDS', self.refresh_interval)
+        self.capacity = app.config.get('REVOCATION_BLOOM_CAPACITY', self.capacity)
+        self.error_rate = app.config.get('REVOCATION_BLOOM_ERROR_RATE', self.error_rate)
+        app.extensions['revocation_cache'] = self
+
+    def is_revoked(self, jti):
+        """check whether a token id has been revoked"""
+        from api.models.tokenblacklist import TokenBlacklist
+
+        self._maybe_refresh()
+        if jti not in self._bloom:
+            self.hits += 1
+            return False
+
+        self.misses += 1
+        return TokenBlacklist.query.filter_by(jti=jti).first() is not None
+
+    def add(self, jti):
+        """record a revocation made by this worker so it is visible immediately"""
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(jti)
+
+    def reset(self):
+        """drop the filter so the next check reloads it from the database"""
+        with self._lock:
+            self._bloom = None
+            self._watermark = None
+
+    def stats(self):
+        """hit/miss counters and filter occupancy"""
+        bloom = self._bloom
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "refreshes": self.refreshes,
+            "entries": bloom.count if bloom else 0,
+            "capacity": bloom.capacity if bloom else self.capacity,
+            "watermark": self._watermark.isoformat() if self._watermark else None,
+        }
+
+    def _maybe_refresh(self):
+        if self._bloom is not None and time.monotonic() - self._last_refresh < self.refresh_interval:
+            return
+        with self._lock:
+            if self._bloom is not None and time.monotonic() - self._last_refresh < self.refresh_interval:
+                return
+            self._refresh()
+
+    def _refresh(self):
+        from api.models.tokenblacklist import TokenBlacklist
+
+        if self._bloom is None or self._bloom.count >= self._bloom.capacity:
+            capacity = self.capacity
+            if self._bloom is not None:
+                capacity = max(capacity, self._bloom.capacity * 2)
+            self._bloom = BloomFilter(capacity, self.error_rate)
+            self._watermark = None
+
+        query = TokenBlacklist.query.with_entities(TokenBlacklist.jti, TokenBlacklist.created_at)
+        if self._watermark is not None:
+            # Overlap by one interval so rows committed late by slower
+            # transactions on other workers are not skipped.
+            since = self._watermark - timedelta(seconds=self.refresh_interval)
+            query = query.filter(TokenBlacklist.created_at >= since)
+
+        for jti, created_at in query:
+            self._bloom.add(jti)
+            if created_at is not None and (self._watermark is None or created_at > self._watermark):
+                self._watermark = created_at
+
+        self._last_refresh = time.monotonic()
+        self.refreshes += 1
@@ -1,8 +1,15 @@
-from flask import Blueprint, jsonify
-from flask_jwt_extended import jwt_required
-
-from api import db
-from api.auth import role_required
+from collections import Counter
+from flask import Blueprint, jsonify, request
+from flask_jwt_extended import current_user, jwt_required
+from sqlalchemy import case, or_
+
+from api import db, feed, jobs, password_pool, revocation_cache
+from api.auth import ROLE_PERMISSIONS, permission_required
+from api.blobs import release_pictures_files
+from api.bulk import read_ids
+from api.export import ndjson_response, wants_ndjson
+from api.pagination import paginate
+from api.serializers import comment_serializer, picture_serializer, user_serializer
 from api.models.comment import Comment
 from api.models.picture import Picture
 from api.models.user import User
@@ -14,64 +21,48 @@ admin_bp = Blueprint('admin_bp', __name__)
 # Get all users
 @admin_bp.route('/users', methods=['GET'], endpoint='get_all_users')
 @jwt_required()
-@role_required('admin')
+@permission_required('users:read')
 def get_all_users():
     """retrieve all users from database"""
-    users = User.query.all()
-    users_list = []
-    users_list = [{
-        "id": user.id,
-        "username": user.username,
-        "email": user.email,
-        "role": user.role
-    } for user in users]
+    if wants_ndjson():
+        return ndjson_response(user_serializer.project(User.query, User).order_by(User.id), user_serializer)
 
-    return jsonify(users_list), 200
+    users, next_cursor = paginate(user_serializer.project(User.query, User), User)
+    return jsonify({"users": user_serializer.many(users), "next_cursor": next_cursor}), 200
 
 
 @admin_bp.route('/pictures', methods=['GET'], endpoint='get_all_pictures')
 @jwt_required()
-@role_required('admin')
+@permission_required('pictures:read')
 def get_all_pictures():
     """retrieve all pictures across all users"""
-    pictures = Picture.query.all()
-    return jsonify([
-        {
-            "id": picture.id,
-            "user_id": picture.user_id,
-            "image_url": picture.image_url,
-            "description": picture.description,
-            "created_at": picture.created_at,
-            "updated_at": picture.updated_at
-        } for picture in pictures
-    ]), 200
+    if wants_ndjson():
+        return ndjson_response(picture_serializer.project(Picture.query, Picture).order_by(Picture.id), picture_serializer)
+
+    pictures, next_cursor = paginate(picture_serializer.project(Picture.query, Picture), Picture)
+    return jsonify({"pictures": picture_serializer.many(pictures), "next_cursor": next_cursor}), 200
 
 
 # GET: Retrieve all the comments of a specific user
 @admin_bp.route('/user/<int:user_id>/comments', methods=['GET'], endpoint="get_user_comments")
-@role_required('admin')
+@permission_required('comments:read')
 def get_user_comments(user_id):
     """retrieve all comments of a specific user"""
     user = User.query.get(user_id)
     if not user:
         return jsonify({"error": "User not found"}), 404
 
-    comments = Comment.query.filter_by(user_id=user_id).all()
-    comments_list = [{
-        "id": comment.id,
-        "user_id": comment.user_id,
-        "picture_id": comment.picture_id,
-        "content": comment.content,
-        "created_at": comment.created_at,
-        "updated_at": comment.updated_at
-    } for comment in comments]
+    if wants_ndjson():
+        query = comment_serializer.project(Comment.query.filter_by(user_id=user_id), Comment)
+        return ndjson_response(query.order_by(Comment.id), comment_serializer)
 
-    return jsonify(comments_list), 200
+    comments, next_cursor = paginate(comment_serializer.project(Comment.query.filter_by(user_id=user_id), Comment), Comment)
+    return jsonify({"comments": comment_serializer.many(comments), "next_cursor": next_cursor}), 200
 
 
 @admin_bp.route('/promote-user/<int:user_id>', methods=['PUT'], endpoint='make_admin')
 @jwt_required()
-@role_required('admin')
+@permission_required('users:promote')
 def make_admin(user_id):
     """give a user admin privileges"""
     user = User.query.get(user_id)
@@ -82,14 +73,17 @@ def make_admin(user_id):
         return jsonify({"message": "User is already an admin"}), 400
 
     user.role = 'admin'
+    user.token_version += 1
+    # Built before the commit expires the user, which would cost a reload
+    message = f"User {user.username} promoted to admin!"
     db.session.commit()
 
-    return jsonify({"message": f"User {user.username} promoted to admin!"}), 200
+    return jsonify({"message": message}), 200
 
 
 @admin_bp.route('/demote-user/<int:user_id>', methods=['PUT'], endpoint='demote_admin')
 @jwt_required()
-@role_required('admin')
+@permission_required('users:promote')
 def demote_admin(user_id):
     """revoke admin privileges of a user"""
     user = User.query.get(user_id)
@@ -100,6 +94,118 @@ def demote_admin(user_id):
         return jsonify({"message": "User is already a regular"}), 400
 
     user.role = 'user'
+    user.token_version += 1
+    # Built before the commit expires the user, which would cost a reload
+    message = f"User {user.username} demoted to regular user!"
     db.session.commit()
 
-    return jsonify({"message": f"User {user.username} demoted to regular user!"}), 200
+    return jsonify({"message": message}), 200
+
+
+def _bulk_result(key, ids, found):
+    """summary of a bulk admin action: how many rows it hit and which ids did not exist"""
+    return {key: len(found), "not_found": sorted(ids.difference(found))}
+
+
+@admin_bp.route('/pictures/bulk-delete', methods=['POST'], endpoint='delete_pictures_bulk')
+@jwt_required()
+@permission_required('pictures:delete')
+def delete_pictures_bulk():
+    """delete many pictures, and their comments, with set-based statements"""
+    ids = read_ids()
+    found = set(db.session.scalars(db.select(Picture.id).where(Picture.id.in_(ids))))
+
+    if found:
+        keys = release_pictures_files(found)
+        db.session.execute(db.delete(Comment).where(Comment.picture_id.in_(found)))
+        db.session.execute(db.delete(Picture).where(Picture.id.in_(found)))
+        db.session.commit()
+        for picture_id in found:
+            feed.remove(picture_id)
+        # Files are unlinked in the background once nothing references them
+        if keys:
+            jobs.enqueue('delete_files', keys=keys)
+
+    return jsonify(_bulk_result("deleted", ids, found)), 200
+
+
+@admin_bp.route('/comments/bulk-delete', methods=['POST'], endpoint='delete_comments_bulk')
+@jwt_required()
+@permission_required('comments:delete')
+def delete_comments_bulk():
+    """delete many comments and take them off their pictures' counts"""
+    ids = read_ids()
+    rows = db.session.query(Comment.id, Comment.picture_id).filter(Comment.id.in_(ids)).all()
+    found = {row.id for row in rows}
+
+    if found:
+        removed = Counter(row.picture_id for row in rows)
+        db.session.execute(db.delete(Comment).where(Comment.id.in_(found)))
+        Picture.query.filter(Picture.id.in_(removed)).update(
+            {Picture.comment_count: Picture.comment_count - case(removed, value=Picture.id)},
+            synchronize_session=False)
+        db.session.commit()
+        for picture_id, count in removed.items():
+            feed.count_comments(picture_id, -count)
+
+    return jsonify(_bulk_result("deleted", ids, found)), 200
+
+
+@admin_bp.route('/users/bulk-delete', methods=['POST'], endpoint='delete_users_bulk')
+@jwt_required()
+@permission_required('users:delete')
+def delete_users_bulk():
+    """delete many users with their pictures and comments"""
+    ids = read_ids()
+    if current_user.id in ids:
+        return jsonify({"error": "You cannot delete your own account here"}), 400
+
+    found = set(db.session.scalars(db.select(User.id).where(User.id.in_(ids))))
+    if found:
+        their_pictures = db.select(Picture.id).where(Picture.user_id.in_(found))
+        keys = release_pictures_files(their_pictures)
+        # Their comments on other users' pictures come off those counts first
+        Picture.uncount_comments_by(*found)
+        db.session.execute(db.delete(Comment).where(
+            or_(Comment.user_id.in_(found), Comment.picture_id.in_(their_pictures))))
+        db.session.execute(db.delete(Picture).where(Picture.user_id.in_(found)))
+        db.session.execute(db.delete(User).where(User.id.in_(found)))
+        db.session.commit()
+        feed.reset()
+        if keys:
+            jobs.enqueue('delete_files', keys=keys)
+
+    return jsonify(_bulk_result("deleted", ids, found)), 200
+
+
+@admin_bp.route('/users/bulk-role', methods=['PUT'], endpoint='set_roles_bulk')
+@jwt_required()
+@permission_required('users:promote')
+def set_roles_bulk():
+    """give many users the same role; their existing tokens stop working"""
+    ids = read_ids()
+    data = request.get_json()
+    role = data.get('role')
+    if role not in ROLE_PERMISSIONS:
+        return jsonify({"error": f"Role must be one of {', '.join(ROLE_PERMISSIONS)}"}), 400
+
+    found = set(db.session.scalars(db.select(User.id).where(User.id.in_(ids))))
+    updated = db.session.execute(
+        db.update(User).where(User.id.in_(found), User.role != role)
+        .values(role=role, token_version=User.token_version + 1)).rowcount
+    db.session.commit()
+
+    return jsonify({"updated": updated, "unchanged": len(found) - updated, "not_found": sorted(ids.difference(found))}), 200
+
+
+@admin_bp.route('/metrics', methods=['GET'], endpoint='get_metrics')
+@jwt_required()
+@permission_required('metrics:read')
+def get_metrics():
+    """report in-process queue, pool, feed and cache metrics for this worker"""
+    return jsonify({
+        "feed": feed.stats(),
+        "jobs": jobs.stats(),
+        "password_pool": password_pool.stats(),
+        "revocation_cache": revocation_cache.stats()
+    }), 200
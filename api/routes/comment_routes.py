@@ -1,11 +1,15 @@
 #!/usr/bin/env python3
+from collections import Counter, defaultdict
 from flask import Blueprint, request, jsonify
+from sqlalchemy import case, insert
 from flask_jwt_extended import get_jwt_identity, jwt_required
 from api.auth import role_required
+from api.bulk import is_id, item_error, read_batch
+from api.pagination import paginate
+from api.serializers import comment_serializer
 from api.models.picture import Picture
-from api.models.user import User
 from api.models.comment import Comment
-from api import db
+from api import db, feed
 
 
 # Create a bp for comment-related routes
@@ -28,27 +32,64 @@ def add_comment(picture_id):
     if not picture:
         return jsonify({"error": "Picture not found"}), 404
 
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
     new_comment = Comment(user_id=current_user_id, picture_id=picture_id, content=content)
     db.session.add(new_comment)
+    # Incremented in SQL so concurrent comments are not lost
+    picture.comment_count = Picture.comment_count + 1
     db.session.commit()
+    feed.count_comments(picture_id, 1)
 
     return jsonify({
         "message": "Comment added successfully",
-        "comment": {
-            "id": new_comment.id,
-            "user_id": new_comment.user_id,
-            "picture_id": new_comment.picture_id,
-            "content": new_comment.content,
-            "created_at": new_comment.created_at,
-            "updated_at": new_comment.updated_at
-        }
+        "comment": comment_serializer(new_comment)
     }), 201
 
 
+# POST: Add many comments, to any pictures, in one request
+@comment_bp.route('/comments/bulk', methods=['POST'], endpoint='add_comments_bulk')
+@jwt_required()
+def add_comments_bulk():
+    """add a batch of comments in one transaction, reporting a result per item"""
+    items = read_batch('comments')
+    current_user_id = get_jwt_identity()
+
+    # Check every referenced picture with a single IN query
+    picture_ids = {item.get('picture_id') for item in items if is_id(item.get('picture_id'))}
+    existing = {row.id for row in db.session.query(Picture.id).filter(Picture.id.in_(picture_ids))}
+
+    results = [None] * len(items)
+    pending = []
+    for index, item in enumerate(items):
+        content = item.get('content')
+        if not isinstance(content, str) or not content:
+            results[index] = item_error(index, 400, "Comment content is required")
+        elif not is_id(item.get('picture_id')) or item['picture_id'] not in existing:
+            results[index] = item_error(index, 404, "Picture not found")
+        else:
+            pending.append((index, {"user_id": current_user_id, "picture_id": item['picture_id'], "content": content}))
+
+    if pending:
+        # One multi-row INSERT ... RETURNING. Rows may come back in any order,
+        # so pair them with items by their values, earliest id first.
+        comments = db.session.scalars(insert(Comment).returning(Comment), [values for _, values in pending]).all()
+        created = defaultdict(list)
+        for comment in sorted(comments, key=lambda comment: comment.id):
+            created[comment.picture_id, comment.content].append(comment)
+        for index, values in pending:
+            comment = created[values['picture_id'], values['content']].pop(0)
+            results[index] = {"index": index, "status": 201, "comment": comment_serializer(comment)}
+
+        added = Counter(values['picture_id'] for _, values in pending)
+        Picture.query.filter(Picture.id.in_(added)).update(
+            {Picture.comment_count: Picture.comment_count + case(added, value=Picture.id)},
+            synchronize_session=False)
+        db.session.commit()
+        for picture_id, count in added.items():
+            feed.count_comments(picture_id, count)
+
+    return jsonify({"results": results}), 200
+
+
 # GET: Retrieve all comments for a specific picture
 @comment_bp.route('/pictures/<int:picture_id>/comments', methods=['GET'])
 @jwt_required()
@@ -58,17 +99,9 @@ def get_comments(picture_id):
     if not picture:
         return jsonify({"error": "Picture not found"}), 404
 
-    comments = Comment.query.filter_by(picture_id=picture_id).all()
-    comments_list = [{
-        "id": comment.id,
-        "user_id": comment.user_id,
-        "picture_id": comment.picture_id,
-        "content": comment.content,
-        "created_at": comment.created_at,
-        "updated_at": comment.updated_at
-    } for comment in comments]
-
-    return jsonify(comments_list), 200
+    comments, next_cursor = paginate(
+        comment_serializer.project(Comment.query.filter_by(picture_id=picture_id), Comment), Comment)
+    return jsonify({"comments": comment_serializer.many(comments), "next_cursor": next_cursor}), 200
 
 
 # GET: Retrieve a comment by it's id
@@ -80,14 +113,7 @@ def get_comment(comment_id):
     if not comment:
         return jsonify({"error": "Comment not found"}), 404
 
-    return jsonify({
-        "id": comment.id,
-        "user_id": comment.user_id,
-        "picture_id": comment.picture_id,
-        "content": comment.content,
-        "created_at": comment.created_at,
-        "updated_at": comment.updated_at
-    }), 200
+    return jsonify(comment_serializer(comment)), 200
 
 
 # PUT: Update a specific comment
@@ -116,14 +142,7 @@ def update_comment(comment_id):
 
     return jsonify({
         "message": "Comment updated successfully!",
-        "comment": {
-            "id": comment.id,
-            "user_id": comment.user_id,
-            "picture_id": comment.picture_id,
-            "content": comment.content,
-            "created_at": comment.created_at,
-            "updated_at": comment.updated_at
-        }
+        "comment": comment_serializer(comment)
     }), 200
 
 
@@ -142,6 +161,9 @@ def delete_comment(comment_id):
         return jsonify({"error": "You are not allowed to delete this comment"}), 403
 
     db.session.delete(comment)
+    Picture.query.filter_by(id=comment.picture_id).update(
+        {Picture.comment_count: Picture.comment_count - 1}, synchronize_session=False)
     db.session.commit()
+    feed.count_comments(comment.picture_id, -1)
 
     return jsonify({"message": "Comment deleted successfully!"}), 200
@@ -0,0 +1,31 @@
+from datetime import datetime
+from flask import Blueprint, request, jsonify
+from flask_jwt_extended import jwt_required
+from api import feed
+from api.feed import sort_key
+from api.pagination import PaginationError, decode_cursor, encode_cursor, get_limit
+
+
+# Create a bp for the home feed
+feed_bp = Blueprint('feed_bp', __name__)
+
+
+@feed_bp.route('/feed', methods=['GET'], endpoint='get_feed')
+@jwt_required()
+def get_feed():
+    """retrieve the most recent pictures of all users, newest first"""
+    limit = get_limit()
+
+    after = None
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            created_at, last_id = decode_cursor(cursor)
+            after = sort_key(datetime.fromisoformat(created_at) if created_at else None, int(last_id))
+        except (ValueError, TypeError):
+            raise PaginationError("Invalid cursor")
+
+    pictures, has_more = feed.page(after, limit)
+    next_cursor = encode_cursor(pictures[-1]['created_at'], pictures[-1]['id']) if has_more else None
+
+    return jsonify({"pictures": pictures, "next_cursor": next_cursor}), 200
@@ -1,22 +1,60 @@
-from uuid import uuid4
-from flask import Blueprint, request, jsonify
-from api import db
+import mimetypes
+from flask import Blueprint, current_app, make_response, redirect, request, jsonify, send_file
+from sqlalchemy import update
+from api import db, feed, jobs, storage
 from api.auth import role_required
 from api.models.comment import Comment
 from api.models.picture import Picture
+from api.pagination import paginate
+from api.search import find_pictures
+from api.serializers import (PICTURE_INCLUDES, expand_picture, picture_load_options, picture_serializer,
+                             requested_includes)
+from api.blobs import release_picture_files, store_upload
+from api.bulk import is_id, item_error, read_batch
+from api.uploads import UploadRejected
 import os
-from werkzeug.utils import secure_filename
-from api.models.user import User
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import current_user, jwt_required, get_jwt_identity
 
 
-UPLOAD_FOLDER = 'uploads'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 
 
 def allowed_file(filename):
     """checks if a file type is allowed"""
-    return '.' and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+    return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
+
+
+def send_picture_file(key, etag=True):
+    """serve a stored file with validators and long-lived caching
+
+    Stored files are content-addressed and never rewritten, so clients may
+    cache them indefinitely. Range and If-None-Match are answered by
+    send_file; the bytes themselves are handed to the front-end server when
+    USE_X_SENDFILE or X_ACCEL_REDIRECT_PREFIX is configured. Backends
+    without local files redirect to a presigned URL instead.
+    """
+    path = storage.local_path(key)
+    if path is None:
+        return redirect(storage.presign(key, current_app.config['STORAGE_PRESIGN_EXPIRES']))
+
+    if not os.path.isfile(path):
+        return jsonify({"error": "File not found"}), 404
+
+    max_age = current_app.config['PICTURE_FILE_MAX_AGE']
+    accel_prefix = current_app.config['X_ACCEL_REDIRECT_PREFIX']
+    if accel_prefix:
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = accel_prefix.rstrip('/') + '/' + key
+        response.mimetype = mimetypes.guess_type(key)[0] or 'application/octet-stream'
+    else:
+        response = send_file(os.path.abspath(path), conditional=True, etag=etag, max_age=max_age)
+
+    # Files sit behind authentication, so only the client may cache them
+    response.cache_control.public = False
+    response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    response.cache_control.immutable = True
+    return response
 
 
 # Create a bp for picture-related routes
@@ -27,11 +65,7 @@ picture_bp = Blueprint('picture_bp', __name__)
 @jwt_required()
 def upload_picture():
     """Upload a new picture with a dynamic description."""
-    current_user_id = get_jwt_identity()
-    # Check if the current user exists
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    user = current_user
 
     # Check if the post request has the file part
     if 'file' not in request.files:
@@ -48,25 +82,26 @@ def upload_picture():
 
     # Check if the file is allowed
     if file and allowed_file(file.filename):
-        filename = secure_filename(file.filename)
-        unique_filename = f"{uuid4()}_{filename}"
-        file_path = os.path.join(UPLOAD_FOLDER, unique_filename)
-        file.save(file_path)
-
-        new_picture = Picture(user_id=current_user_id, image_url=file_path, description=description)
+        # Identical uploads share one stored file
+        try:
+            blob = store_upload(file.stream, current_app.config['MAX_UPLOAD_SIZE'])
+        except UploadRejected as err:
+            return jsonify({"error": str(err)}), err.status_code
+
+        new_picture = Picture(user_id=user.id, image_url=blob.key, description=description,
+                              content_hash=blob.content_hash)
         db.session.add(new_picture)
+        # Read before the commit expires the user, saving a reload
+        username = user.username
         db.session.commit()
+        feed.add(new_picture, username)
+
+        # Resized variants are generated in the background
+        jobs.enqueue('create_picture_variants', picture_id=new_picture.id)
 
         return jsonify({
             "message": "Picture uploaded successfully!",
-            "picture": {
-                "id": new_picture.id,
-                "user_id": new_picture.user_id,
-                "image_url": file_path,
-                "description": new_picture.description,
-                "created_at": new_picture.created_at,
-                "updated_at": new_picture.updated_at
-            }
+            "picture": picture_serializer(new_picture)
         }), 201
 
     return jsonify({"error": "File type not allowed"}), 400
@@ -75,40 +110,48 @@ def upload_picture():
 @picture_bp.route('/pictures/<int:picture_id>', methods=['GET'], endpoint='get_picture_by_id')
 @jwt_required()
 def get_picture_by_id(picture_id):
-    """retrieve a picture by its id"""
+    """retrieve a picture by its id, optionally with its comments and author"""
+    includes = requested_includes(PICTURE_INCLUDES)
+    picture = Picture.query.options(*picture_load_options(includes)).filter_by(id=picture_id).first()
+    if not picture:
+        return jsonify({"error": "Picture not found"}), 404
+
+    return jsonify(expand_picture(picture, includes)), 200
+
+
+@picture_bp.route('/pictures/<int:picture_id>/file', methods=['GET'], endpoint='get_picture_file', defaults={'variant': None})
+@picture_bp.route('/pictures/<int:picture_id>/file/<variant>', methods=['GET'], endpoint='get_picture_file')
+@jwt_required()
+def get_picture_file(picture_id, variant):
+    """download a picture, or one of its resized variants"""
     picture = Picture.query.get(picture_id)
     if not picture:
         return jsonify({"error": "Picture not found"}), 404
 
-    return jsonify({
-        "id": picture.id,
-        "user_id": picture.user_id,
-        "image_url": picture.image_url,
-        "description": picture.description,
-        "created_at": picture.created_at,
-        "updated_at": picture.updated_at
-    }), 200
+    if variant is None:
+        # The content hash makes a strong ETag that survives copies between servers
+        return send_picture_file(picture.image_url, etag=picture.content_hash or True)
+
+    path = (picture.variants or {}).get(variant)
+    if not path:
+        return jsonify({"error": "Variant not found"}), 404
+
+    return send_picture_file(path)
 
 
 @picture_bp.route('/user/pictures', methods=['GET'], endpoint='get_user_pictures')
 @jwt_required()
 def get_user_pictures():
-    """retrieve all pictures of a particular user"""
-    current_user_id = get_jwt_identity()
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
-    user_pictures = Picture.query.filter_by(user_id=current_user_id).all()
-    return jsonify([{
-        "id": picture.id,
-        "user_id": picture.user_id,
-        "image_url": picture.image_url,
-        "description": picture.description,
-        "created_at": picture.created_at,
-        "updated_at": picture.updated_at
-        } for picture in user_pictures
-    ]), 200
+    """retrieve all pictures of a particular user, optionally with comments and author"""
+    includes = requested_includes(PICTURE_INCLUDES)
+    query = Picture.query.filter_by(user_id=current_user.id)
+    if not includes:
+        user_pictures, next_cursor = paginate(picture_serializer.project(query, Picture), Picture)
+        return jsonify({"pictures": picture_serializer.many(user_pictures), "next_cursor": next_cursor}), 200
+
+    user_pictures, next_cursor = paginate(query.options(*picture_load_options(includes)), Picture)
+    pictures_list = [expand_picture(picture, includes) for picture in user_pictures]
+    return jsonify({"pictures": pictures_list, "next_cursor": next_cursor}), 200
 
 
 @picture_bp.route('/pictures/<int:picture_id>', methods=['PUT'], endpoint='update_picture')
@@ -129,22 +172,60 @@ def update_picture(picture_id):
     if description:
         picture.description = description
 
+    username = current_user.username
     db.session.commit()
     db.session.refresh(picture)
+    feed.add(picture, username)
 
     return jsonify({
         "message": "Picture updated successfully",
-        "picture": {
-            "id": picture.id,
-            "user_id": picture.user_id,
-            "image_url": picture.image_url,
-            "description": picture.description,
-            "created_at": picture.created_at,
-            "updated_at": picture.updated_at
-        }
+        "picture": picture_serializer(picture)
         }), 200
 
 
+@picture_bp.route('/pictures/bulk', methods=['PUT'], endpoint='update_pictures_bulk')
+@jwt_required()
+def update_pictures_bulk():
+    """update the descriptions of a batch of pictures in one transaction"""
+    items = read_batch('pictures')
+
+    # Look up every referenced picture's owner with a single IN query
+    ids = {item.get('id') for item in items if is_id(item.get('id'))}
+    owners = dict(db.session.query(Picture.id, Picture.user_id).filter(Picture.id.in_(ids)).all())
+
+    results = [None] * len(items)
+    pending = []
+    seen = set()
+    for index, item in enumerate(items):
+        picture_id = item.get('id')
+        description = item.get('description')
+        if not isinstance(description, str) or not description:
+            results[index] = item_error(index, 400, "Description is required")
+        elif not is_id(picture_id) or picture_id not in owners:
+            results[index] = item_error(index, 404, "Picture not found")
+        elif owners[picture_id] != current_user.id:
+            results[index] = item_error(index, 403, "You are not allowed to update this picture")
+        elif picture_id in seen:
+            results[index] = item_error(index, 400, "Picture is listed more than once")
+        else:
+            seen.add(picture_id)
+            pending.append((index, {"id": picture_id, "description": description}))
+
+    if pending:
+        # One executemany UPDATE keyed by primary key
+        db.session.execute(update(Picture), [values for _, values in pending])
+        updated = picture_serializer.project(Picture.query.filter(Picture.id.in_(seen)), Picture)
+        pictures = {picture.id: picture for picture in updated}
+        db.session.commit()
+
+        for index, values in pending:
+            picture = pictures[values['id']]
+            results[index] = {"index": index, "status": 200, "picture": picture_serializer(picture)}
+            feed.add(picture, current_user.username)
+
+    return jsonify({"results": results}), 200
+
+
 @picture_bp.route('/pictures/<int:picture_id>', methods=['DELETE'], endpoint='delete_picture')
 @jwt_required()
 def delete_picture(picture_id):
@@ -159,13 +240,17 @@ def delete_picture(picture_id):
     if picture.user_id != current_user_id:
         return jsonify({"error": "You are not allowed to delete this picture"}), 403
 
-    # Delete the picture from the file system
-    if os.path.exists(picture.image_url):
-        os.remove(picture.image_url)
+    # Files are only removed once no other picture shares them
+    keys = release_picture_files(picture)
 
     # Delete the image_url entry from db
     db.session.delete(picture)
     db.session.commit()
+    feed.remove(picture_id)
+
+    # Delete the picture and its variants from the file system in the background
+    if keys:
+        jobs.enqueue('delete_files', keys=keys)
 
     return jsonify({"message": "Picture deleted successfully!"}), 200
 
@@ -174,20 +259,11 @@ def delete_picture(picture_id):
 @picture_bp.route('/pictures/search', methods=['GET'])
 @jwt_required()
 def search_pictures():
-    """search for pictures by description"""
+    """search for pictures by description, best matches first"""
     query = request.args.get('q', '')
     if not query:
         return jsonify({"error": "Search query is required"}), 400
 
-    pictures = Picture.query.filter(Picture.description.ilike(f"%{query}%")).all()
-
-    pictures_list = [{
-        "id": picture.id,
-        "user_id": picture.user_id,
-        "image_url": picture.image_url,
-        "description": picture.description,
-        "created_at": picture.created_at,
-        "updated_at": picture.updated_at,
-    } for picture in pictures]
+    pictures, next_cursor = find_pictures(query)
 
-    return jsonify(pictures_list), 200
+    return jsonify({"pictures": picture_serializer.many(pictures), "next_cursor": next_cursor}), 200
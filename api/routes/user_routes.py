@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
-import os
+from datetime import datetime, timezone
 from flask import Blueprint, request, jsonify
-from api import db
+from api import db, feed, jobs, limiter, revocation_cache
 from api.auth import authenticate_user, generate_token, role_required
+from api.blobs import release_picture_files
+from api.models.picture import Picture
 from api.models.tokenblacklist import TokenBlacklist
 from api.models.user import User
-from flask_jwt_extended import get_jwt, jwt_required, get_jwt_identity
+from api.serializers import user_serializer
+from flask_jwt_extended import current_user, get_jwt, jwt_required
 
 
 # Create a Blueprint for user-related routes
@@ -14,6 +17,7 @@ user_bp = Blueprint('user_bp', __name__)
 
 # Registration route
 @user_bp.route('/register', methods=['POST'], endpoint='register')
+@limiter.limit(account_field='email')
 def register():
     """register a user"""
     # Get sign up info from request object
@@ -44,6 +48,7 @@ def register():
 
 # Login route
 @user_bp.route('/login', methods=['POST'], endpoint='login')
+@limiter.limit(account_field='email')
 def login():
     """login a User"""
     # Get login info from request object
@@ -66,10 +71,13 @@ def login():
 @jwt_required()
 def logout():
     """Logout the user by blacklisting their JWT token"""
-    jti = get_jwt()['jti']
-    token_blacklist = TokenBlacklist(jti=jti)
+    jwt_data = get_jwt()
+    jti = jwt_data['jti']
+    expires_at = datetime.fromtimestamp(jwt_data['exp'], timezone.utc)
+    token_blacklist = TokenBlacklist(jti=jti, expires_at=expires_at)
     db.session.add(token_blacklist)
     db.session.commit()
+    revocation_cache.add(jti)
 
     return jsonify({"message": "Logged out successfully!"})
 
@@ -79,23 +87,12 @@ def logout():
 @jwt_required()
 def get_user_profile():
     """retrieve current user's profile"""
-    current_user_id = get_jwt_identity()
-
-    # Retrieve a user from the database
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    user = current_user
 
     # Return user details (except password_hash)
     return jsonify({
     "message": "Profile retrieved successfully",
-    "user": {
-        "id": user.id,
-        "email": user.email,
-        "username": user.username,
-        "created_at": user.created_at,
-        "updated_at": user.updated_at
-    }
+    "user": user_serializer(user)
     }), 200
 
 
@@ -104,11 +101,7 @@ def get_user_profile():
 @jwt_required()
 def update_user_profile():
     """update a user's profile"""
-    current_user_id = get_jwt_identity()
-
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"error": "User not found"})
+    user = current_user
 
     data = request.get_json()
 
@@ -118,29 +111,27 @@ def update_user_profile():
     # Check if the new username or email is already taken
     if username:
         user_by_username = User.query.filter_by(username=username).first()
-        if user_by_username and user_by_username.id != current_user_id:
+        if user_by_username and user_by_username.id != user.id:
             return jsonify({"error": "Username already exists"}), 400
         else:
             user.username = username
 
     if email:
         user_by_email = User.query.filter_by(email=email).first()
-        if user_by_email and user_by_email.id != current_user_id:
+        if user_by_email and user_by_email.id != user.id:
             return jsonify({"error": "Email already exists"}), 400
         else:
             user.email = email
             db.session.refresh(user)
 
     db.session.commit()
+    # Feed entries carry the author's username
+    if username:
+        feed.reset()
     return jsonify({
         "message": "User profile updated successfully!",
-        "user": {
-            "id": user.id,
-            "username": user.username,
-            "email": user.email,
-            "created_at": user.created_at,
-            "updated_at": user.updated_at
-        }}), 200
+        "user": user_serializer(user)
+    }), 200
 
 
 # Delete current user
@@ -148,19 +139,21 @@ def update_user_profile():
 @jwt_required()
 def delete_user():
     """delete the current user"""
-    current_user_id = get_jwt_identity()
+    user = current_user
 
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
-
-    # Delete the user's pictures from the file system
-    for picture in user.pictures:
-        if os.path.exists(picture.image_url):
-            os.remove(picture.image_url)
+    # Files are only removed once no other picture shares them
+    keys = [key for picture in user.pictures for key in release_picture_files(picture)]
 
+    # Their comments on other users' pictures go with them
+    Picture.uncount_comments_by(user.id)
     db.session.delete(user)
     db.session.commit()
+    # Their pictures leave the feed and their comments leave others' counts
+    feed.reset()
+
+    # Delete the user's pictures from the file system in the background
+    if keys:
+        jobs.enqueue('delete_files', keys=keys)
     return jsonify({"message": "User account deleted successfully!"}), 200
 
 
@@ -169,12 +162,7 @@ def delete_user():
 @jwt_required()
 def change_password():
     """change a user's password"""
-    current_user_id = get_jwt_identity()
-
-    # Retrieve user from db by user_id
-    user = User.query.get(current_user_id)
-    if not user:
-        return jsonify({"error": "User not found"}), 404
+    user = current_user
 
     # Extract password from request object
     data = request.get_json()
@@ -194,6 +182,7 @@ def change_password():
 
 # Reset forgotten password
 @user_bp.route('/forgot-password', methods=['POST'], endpoint='forgot_password')
+@limiter.limit(account_field='email')
 def forgot_password():
     """reset a user's forgotten password"""
     data = request.get_json()
@@ -0,0 +1,140 @@
+import re
+from flask import current_app, request
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError, ProgrammingError
+from api import db
+from api.models.picture import Picture
+from api.pagination import PaginationError, decode_cursor, encode_cursor, get_limit, paginate
+from api.serializers import picture_serializer
+
+
+# SQLite: external-content FTS5 table kept in sync with pictures by triggers
+SQLITE_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS pictures_fts USING fts5(
+        description, content='pictures', content_rowid='id', tokenize='porter unicode61'
+    )""",
+    """CREATE TRIGGER IF NOT EXISTS pictures_fts_ai AFTER INSERT ON pictures BEGIN
+        INSERT INTO pictures_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pictures_fts_ad AFTER DELETE ON pictures BEGIN
+        INSERT INTO pictures_fts(pictures_fts, rowid, description) VALUES ('delete', old.id, old.description);
+    END""",
+    """CREATE TRIGGER IF NOT EXISTS pictures_fts_au AFTER UPDATE OF description ON pictures BEGIN
+        INSERT INTO pictures_fts(pictures_fts, rowid, description) VALUES ('delete', old.id, old.description);
+        INSERT INTO pictures_fts(rowid, description) VALUES (new.id, new.description);
+    END""",
+]
+
+# Postgres: generated tsvector column, maintained by the database itself
+POSTGRES_DDL = [
+    """ALTER TABLE pictures ADD COLUMN IF NOT EXISTS search_vector tsvector
+        GENERATED ALWAYS AS (to_tsvector('english', coalesce(description, ''))) STORED""",
+    "CREATE INDEX IF NOT EXISTS ix_pictures_search_vector ON pictures USING GIN (search_vector)",
+]
+
+# Both queries yield (id, score) where a lower score is a better match
+SQLITE_SEARCH = {
+    'id': 'rowid',
+    'score': 'bm25(pictures_fts)',
+    'sql': """
+        SELECT rowid AS id, bm25(pictures_fts) AS score
+        FROM pictures_fts
+        WHERE pictures_fts MATCH :match {after}
+        ORDER BY score, id
+        LIMIT :limit
+    """,
+}
+
+POSTGRES_SEARCH = {
+    'id': 'id',
+    'score': "-ts_rank(search_vector, to_tsquery('english', :match))",
+    'sql': """
+        SELECT id, -ts_rank(search_vector, to_tsquery('english', :match)) AS score
+        FROM pictures
+        WHERE search_vector @@ to_tsquery('english', :match) {after}
+        ORDER BY score, id
+        LIMIT :limit
+    """,
+}
+
+
+def search_terms(query):
+    """split a free-text query into plain word tokens"""
+    return re.findall(r'\w+', query)
+
+
+def ensure_search_index():
+    """create the full-text index objects if they are missing"""
+    dialect = db.engine.dialect.name
+    statements = {'sqlite': SQLITE_DDL, 'postgresql': POSTGRES_DDL}.get(dialect)
+    if statements is None:
+        return False
+    for statement in statements:
+        db.session.execute(text(statement))
+    db.session.commit()
+    return True
+
+
+def rebuild_search_index():
+    """re-index every picture; returns the number of pictures covered"""
+    if not ensure_search_index():
+        return 0
+    if db.engine.dialect.name == 'sqlite':
+        db.session.execute(text("INSERT INTO pictures_fts(pictures_fts) VALUES ('rebuild')"))
+        db.session.commit()
+    # On Postgres the generated column is computed for existing rows when it is added
+    return Picture.query.count()
+
+
+def substring_search(query):
+    """unranked fallback for databases without a full-text index"""
+    pictures = picture_serializer.project(Picture.query, Picture)
+    return paginate(pictures.filter(Picture.description.ilike(f"%{query}%")), Picture)
+
+
+def find_pictures(query):
+    """ranked, prefix-matching picture search; returns (picture rows, next_cursor)
+
+    Results are ordered by relevance and paged with a (score, id) cursor.
+    Databases without a full-text index fall back to a substring scan.
+    """
+    dialect = db.engine.dialect.name
+    terms = search_terms(query)
+
+    if dialect == 'sqlite':
+        search, match = SQLITE_SEARCH, ' '.join(f'"{term}"*' for term in terms)
+    elif dialect == 'postgresql':
+        search, match = POSTGRES_SEARCH, ' & '.join(f'{term}:*' for term in terms)
+    else:
+        return substring_search(query)
+
+    if not terms:
+        return [], None
+
+    limit = get_limit()
+    params = {'match': match, 'limit': limit + 1}
+    after = ''
+    cursor = request.args.get('cursor')
+    if cursor:
+        try:
+            score, last_id = decode_cursor(cursor)
+            params.update(score=float(score), last_id=int(last_id))
+        except (ValueError, TypeError):
+            raise PaginationError("Invalid cursor")
+        after = 'AND ({score} > :score OR ({score} = :score AND {id} > :last_id))'.format(**search)
+
+    try:
+        rows = db.session.execute(text(search['sql'].format(after=after)), params).all()
+    except (OperationalError, ProgrammingError):
+        db.session.rollback()
+        current_app.logger.warning("Full-text index missing, run 'flask search-backfill'")
+        return substring_search(query)
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1].score, rows[-1].id)
+
+    matches = picture_serializer.project(Picture.query.filter(Picture.id.in_([row.id for row in rows])), Picture)
+    pictures = {picture.id: picture for picture in matches}
+    return [pictures[row.id] for row in rows if row.id in pictures], next_cursor
@@ -0,0 +1,212 @@
+import hashlib
+import os
+import shutil
+import tempfile
+from contextlib import closing
+
+try:
+    import boto3
+    from botocore.exceptions import ClientError
+except ImportError:  # boto3 is only needed for the s3 backend
+    boto3 = None
+
+
+def shard_prefix(name, depth=2):
+    """fan-out directories for name, e.g. 'ab/cd', derived from a hash of it"""
+    digest = hashlib.sha1(name.encode('utf-8')).hexdigest()
+    return '/'.join(digest[2 * level:2 * level + 2] for level in range(depth))
+
+
+def sharded_key(name, depth=2):
+    """key that stores name under its fan-out directories, e.g. 'ab/cd/<name>'"""
+    if depth <= 0:
+        return name
+    return f"{shard_prefix(name, depth)}/{name}"
+
+
+class StorageBackend:
+    """interface every storage driver implements; files are addressed by key"""
+
+    # Directory uploads are spooled into before put_file()
+    staging_dir = None
+
+    def put(self, key, fileobj):
+        """store the contents of a binary file object under key"""
+        raise NotImplementedError
+
+    def put_file(self, key, path):
+        """move a local file to key; the local file is consumed"""
+        raise NotImplementedError
+
+    def get(self, key):
+        """return the contents stored under key as bytes"""
+        raise NotImplementedError
+
+    def open(self, key):
+        """return a readable binary stream of the contents under key"""
+        raise NotImplementedError
+
+    def delete(self, key):
+        """remove key; removing a missing key is not an error"""
+        raise NotImplementedError
+
+    def exists(self, key):
+        raise NotImplementedError
+
+    def move(self, source, target):
+        """rename source to target within this backend"""
+        with closing(self.open(source)) as fh:
+            self.put(target, fh)
+        self.delete(source)
+
+    def presign(self, key, expires_in=3600):
+        """a time-limited URL clients can fetch key from directly, if supported"""
+        return None
+
+    def local_path(self, key):
+        """the filesystem path of key, for backends that have one"""
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """files under a root directory on the local disk"""
+
+    def __init__(self, root):
+        self.root = root
+        self.staging_dir = root
+
+    def local_path(self, key):
+        path = os.path.normpath(os.path.join(self.root, key))
+        if not path.startswith(os.path.normpath(self.root) + os.sep):
+            raise ValueError(f"Invalid storage key {key!r}")
+        return path
+
+    def put(self, key, fileobj):
+        path = self.local_path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write next to the target and rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix='.put-', suffix='.part')
+        try:
+            with os.fdopen(fd, 'wb') as out:
+                shutil.copyfileobj(fileobj, out)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def put_file(self, key, path):
+        target = self.local_path(key)
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.move(path, target)
+
+    def get(self, key):
+        with self.open(key) as fh:
+            return fh.read()
+
+    def open(self, key):
+        return open(self.local_path(key), 'rb')
+
+    def delete(self, key):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def exists(self, key):
+        return os.path.isfile(self.local_path(key))
+
+    def move(self, source, target):
+        path = self.local_path(target)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        os.replace(self.local_path(source), path)
+
+
+class S3Storage(StorageBackend):
+    """objects in a bucket of any S3-compatible service (AWS, MinIO, ...)
+
+    Takes an existing S3 client when given one, so tests can pass a stand-in.
+    """
+
+    def __init__(self, bucket, endpoint_url=None, region=None, access_key_id=None, secret_access_key=None,
+                 client=None):
+        self.bucket = bucket
+        self.staging_dir = tempfile.gettempdir()
+        if client is not None:
+            self.client = client
+            return
+        if boto3 is None:
+            raise RuntimeError("The s3 storage backend requires boto3")
+        self.client = boto3.client(
+            's3',
+            endpoint_url=endpoint_url,
+            region_name=region,
+            aws_access_key_id=access_key_id,
+            aws_secret_access_key=secret_access_key,
+        )
+
+    def put(self, key, fileobj):
+        self.client.upload_fileobj(fileobj, self.bucket, key)
+
+    def put_file(self, key, path):
+        self.client.upload_file(path, self.bucket, key)
+        os.remove(path)
+
+    def get(self, key):
+        return self.open(key).read()
+
+    def open(self, key):
+        return self.client.get_object(Bucket=self.bucket, Key=key)['Body']
+
+    def delete(self, key):
+        self.client.delete_object(Bucket=self.bucket, Key=key)
+
+    def exists(self, key):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=key)
+        except ClientError as err:
+            if err.response['Error']['Code'] in ('404', 'NoSuchKey', 'NotFound'):
+                return False
+            raise
+        return True
+
+    def move(self, source, target):
+        self.client.copy_object(Bucket=self.bucket, Key=target, CopySource={'Bucket': self.bucket, 'Key': source})
+        self.delete(source)
+
+    def presign(self, key, expires_in=3600):
+        return self.client.generate_presigned_url(
+            'get_object', Params={'Bucket': self.bucket, 'Key': key}, ExpiresIn=expires_in)
+
+
+def create_backend(name, config):
+    """build the storage backend called name from the app config"""
+    if name == 'local':
+        return LocalStorage(config['UPLOAD_FOLDER'])
+    if name == 's3':
+        return S3Storage(
+            config['S3_BUCKET'],
+            endpoint_url=config['S3_ENDPOINT_URL'],
+            region=config['S3_REGION'],
+            access_key_id=config['S3_ACCESS_KEY_ID'],
+            secret_access_key=config['S3_SECRET_ACCESS_KEY'],
+        )
+    raise ValueError(f"Unknown storage backend {name!r}")
+
+
+class Storage:
+    """flask extension exposing the backend selected by STORAGE_BACKEND"""
+
+    def __init__(self, app=None):
+        self.backend = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.backend = create_backend(app.config['STORAGE_BACKEND'], app.config)
+        app.extensions['storage'] = self
+
+    def __getattr__(self, name):
+        if self.backend is None:
+            raise RuntimeError("Storage is not initialized")
+        return getattr(self.backend, name)
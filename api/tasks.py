@@ -0,0 +1,45 @@
+from collections import defaultdict
+from sqlalchemy.exc import IntegrityError
+from api import db, jobs, storage
+from api.blobs import content_hash_of
+from api.imaging import create_picture_variants
+from api.models.blob import Blob
+
+
+jobs.task()(create_picture_variants)
+
+
+@jobs.task()
+def delete_files(keys):
+    """remove files from storage, ignoring ones that are already gone
+
+    Originals and variants of content that has a blob again since the job
+    was queued (the same bytes were re-uploaded) are kept. While the files
+    of a hash are deleted, the hash is claimed with a placeholder blob row,
+    so an upload of the same content arriving meanwhile waits for us rather
+    than having its fresh files deleted.
+    """
+    by_hash = defaultdict(list)
+    for key in keys:
+        by_hash[content_hash_of(key)].append(key)
+
+    # Legacy keys are not named after their content and are never shared
+    for key in by_hash.pop(None, []):
+        storage.delete(key)
+
+    live = set(db.session.scalars(db.select(Blob.content_hash).where(Blob.content_hash.in_(by_hash))))
+    for content_hash, hash_keys in by_hash.items():
+        if content_hash in live:
+            continue
+        try:
+            db.session.add(Blob(content_hash=content_hash, key='', size=0, refcount=0))
+            db.session.flush()
+        except IntegrityError:
+            db.session.rollback()
+            continue
+        try:
+            for key in hash_keys:
+                storage.delete(key)
+        finally:
+            # The placeholder is never committed; rolling back releases the hash
+            db.session.rollback()
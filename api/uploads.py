@@ -0,0 +1,62 @@
+import hashlib
+import os
+import tempfile
+
+
+# Leading bytes of the image formats we accept, mapped to their extension
+IMAGE_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8\xff', 'jpg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+]
+
+
+class UploadRejected(ValueError):
+    """raised when an uploaded file fails validation"""
+    status_code = 400
+
+
+class UploadTooLarge(UploadRejected):
+    status_code = 413
+
+
+def sniff_image_type(head):
+    """detect the real image type from a file's first bytes"""
+    for signature, extension in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return extension
+    return None
+
+
+def ingest_upload(stream, directory, max_size, chunk_size=64 * 1024):
+    """copy an upload into a temporary file in directory
+
+    The stream is read in fixed-size chunks while it is hashed, so memory use
+    does not depend on the size of the upload. Files that are not real images
+    or exceed max_size are rejected as soon as that is known. Returns
+    (temporary path, sha256 hex digest, size, extension); the caller moves the
+    file to its final name with os.replace once it knows where it belongs.
+    """
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix='.upload-', suffix='.part')
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            chunk = stream.read(chunk_size)
+            extension = sniff_image_type(chunk)
+            if not extension:
+                raise UploadRejected("File is not a supported image")
+            while chunk:
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLarge("File is too large")
+                digest.update(chunk)
+                out.write(chunk)
+                chunk = stream.read(chunk_size)
+    except BaseException:
+        os.remove(tmp_path)
+        raise
+
+    return tmp_path, digest.hexdigest(), size, extension
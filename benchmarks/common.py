@@ -0,0 +1,42 @@
+"""Shared setup for the benchmark scripts: a throwaway app and timing helpers"""
+import os
+import statistics
+import tempfile
+import time
+
+
+def make_app(**environ):
+    """an app on a scratch SQLite database with its tables created"""
+    workdir = tempfile.mkdtemp(prefix='ishare-bench-')
+    # Always the scratch workdir: benchmarks write many rows and must never
+    # touch a database or upload folder the developer has configured
+    os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(workdir, 'bench.db')
+    os.environ['UPLOAD_FOLDER'] = os.path.join(workdir, 'uploads')
+    os.environ.setdefault('RATELIMIT_ENABLED', 'false')
+    os.environ.setdefault('BCRYPT_LOG_ROUNDS', '4')
+    os.environ.update(environ)
+
+    from api import create_app, db
+    from api.search import ensure_search_index
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        ensure_search_index()
+    return app
+
+
+def measure(fn, repeat=5, number=1):
+    """best and median seconds per call of fn over repeat rounds of number calls"""
+    rounds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        rounds.append((time.perf_counter() - start) / number)
+    return min(rounds), statistics.median(rounds)
+
+
+def report(name, timings, unit=1e6, suffix='us'):
+    best, median = timings
+    print(f"{name:<44} best {best * unit:10.2f} {suffix}   median {median * unit:10.2f} {suffix}")
@@ -0,0 +1,69 @@
+"""Latency and memory of listing pictures as ORM entities vs projected rows
+
+Seeds a pictures table (100k rows by default), then loads and serializes a
+listing page and the full table (as the NDJSON export does) both as full
+Picture entities and through picture_serializer.project(), reporting time
+and peak Python memory for each.
+
+    python -m benchmarks.projection [--rows 100000] [--page 100]
+"""
+import argparse
+import tracemalloc
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app, measure, report
+
+
+def peak_memory(fn):
+    """peak bytes allocated by Python while fn runs"""
+    tracemalloc.start()
+    try:
+        fn()
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--page', type=int, default=100)
+    args = parser.parse_args()
+
+    app = make_app()
+    from api import db
+    from api.models.picture import Picture
+    from api.models.user import User
+    from api.pagination import page_query
+    from api.serializers import picture_serializer
+
+    with app.app_context():
+        user = User(username='bench', email='bench@example.com', password_hash='x')
+        db.session.add(user)
+        db.session.flush()
+        now = datetime(2024, 1, 1)
+        db.session.execute(db.insert(Picture), [
+            {'user_id': user.id, 'image_url': f'ab/cd/{n:064x}.png', 'description': f'picture {n}',
+             'content_hash': f'{n:064x}', 'comment_count': n % 7,
+             'created_at': now + timedelta(seconds=n), 'updated_at': now + timedelta(seconds=n)}
+            for n in range(args.rows)
+        ])
+        db.session.commit()
+
+        def listing(query, limit):
+            def run():
+                picture_serializer.many(page_query(query(), Picture, limit=limit).all())
+                db.session.expunge_all()
+            return run
+
+        entities = lambda: Picture.query  # noqa: E731
+        projected = lambda: picture_serializer.project(Picture.query, Picture)  # noqa: E731
+        for label, limit, repeat in ((f'page of {args.page}', args.page, 20), (f'all {args.rows} rows', None, 3)):
+            for kind, query in (('ORM entities', entities), ('projected rows', projected)):
+                run = listing(query, limit)
+                report(f'{label}, {kind}', measure(run, repeat=repeat), 1e3, 'ms')
+                print(f"{'':44} peak memory {peak_memory(run) / 2 ** 20:8.1f} MiB")
+
+
+if __name__ == '__main__':
+    main()
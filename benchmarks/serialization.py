@@ -0,0 +1,65 @@
+"""Throughput of serializing a 10k-row picture listing to JSON
+
+Compares the hand-built dicts and default JSON provider the routes used to
+have against picture_serializer with the app's JSONProvider (orjson when it
+is installed), on transient Picture instances.
+
+    python -m benchmarks.serialization [--rows 10000]
+"""
+import argparse
+from datetime import datetime, timedelta
+
+from benchmarks.common import make_app, measure, report
+
+
+def hand_built(picture):
+    return {
+        "id": picture.id,
+        "user_id": picture.user_id,
+        "image_url": picture.image_url,
+        "variants": picture.variants or {},
+        "description": picture.description,
+        "comment_count": picture.comment_count,
+        "created_at": picture.created_at,
+        "updated_at": picture.updated_at,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=10000)
+    args = parser.parse_args()
+
+    app = make_app()
+    from flask.json.provider import DefaultJSONProvider
+    from api.models.picture import Picture
+    from api.serializers import orjson, picture_serializer
+
+    now = datetime(2024, 1, 1)
+    pictures = [
+        Picture(id=n, user_id=n % 100, image_url=f'ab/cd/{n:064x}.png', description=f'picture {n}',
+                variants={'128': f'ab/cd/{n:064x}_128.webp'}, comment_count=n % 7,
+                created_at=now + timedelta(seconds=n), updated_at=now + timedelta(seconds=n))
+        for n in range(args.rows)
+    ]
+    default_json = DefaultJSONProvider(app)
+
+    def before():
+        default_json.dumps({"pictures": [hand_built(picture) for picture in pictures]})
+
+    def serializer_only():
+        default_json.dumps({"pictures": picture_serializer.many(pictures)})
+
+    def after():
+        app.json.dumps({"pictures": picture_serializer.many(pictures)})
+
+    unit, suffix = 1e3, 'ms'
+    report('hand-built dicts, default provider', measure(before), unit, suffix)
+    report('picture_serializer, default provider', measure(serializer_only), unit, suffix)
+    report(f"picture_serializer, JSONProvider ({'orjson' if orjson else 'stdlib'})", measure(after), unit, suffix)
+    best = measure(after)[0]
+    print(f"{args.rows / best:,.0f} rows/s with picture_serializer and JSONProvider")
+
+
+if __name__ == '__main__':
+    main()
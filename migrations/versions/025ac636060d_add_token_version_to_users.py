@@ -0,0 +1,26 @@
+"""Add token_version to users
+
+Revision ID: 025ac636060d
+Revises: a03e1d67e94d
+Create Date: 2026-10-18 16:20:51.736042
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '025ac636060d'
+down_revision = 'a03e1d67e94d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('token_version', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_column('token_version')
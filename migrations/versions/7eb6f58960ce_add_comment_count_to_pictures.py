@@ -0,0 +1,31 @@
+"""Add comment_count to pictures
+
+Revision ID: 7eb6f58960ce
+Revises: 025ac636060d
+Create Date: 2026-10-18 17:05:12.481396
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7eb6f58960ce'
+down_revision = '025ac636060d'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pictures', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('comment_count', sa.Integer(), server_default='0', nullable=False))
+
+    pictures = sa.table('pictures', sa.column('id', sa.Integer), sa.column('comment_count', sa.Integer))
+    comments = sa.table('comments', sa.column('picture_id', sa.Integer))
+    count = sa.select(sa.func.count()).select_from(comments).where(comments.c.picture_id == pictures.c.id)
+    op.execute(pictures.update().values(comment_count=count.scalar_subquery()))
+
+
+def downgrade():
+    with op.batch_alter_table('pictures', schema=None) as batch_op:
+        batch_op.drop_column('comment_count')
@@ -0,0 +1,26 @@
+"""Add variants to pictures
+
+Revision ID: 9764c1942649
+Revises: ac58b01d4f24
+Create Date: 2026-10-18 12:48:13.096502
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9764c1942649'
+down_revision = 'ac58b01d4f24'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pictures', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('variants', sa.JSON(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('pictures', schema=None) as batch_op:
+        batch_op.drop_column('variants')
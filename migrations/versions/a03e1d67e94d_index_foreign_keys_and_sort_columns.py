@@ -0,0 +1,45 @@
+"""Index foreign keys and created_at for paginated listings
+
+Revision ID: a03e1d67e94d
+Revises: e959222535e8
+Create Date: 2026-10-18 15:42:37.204913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a03e1d67e94d'
+down_revision = 'e959222535e8'
+branch_labels = None
+depends_on = None
+
+# Match the newest-first ORDER BY of paginated listings on Postgres
+NEWEST_FIRST = {'postgresql_ops': {'created_at': 'DESC NULLS LAST', 'id': 'DESC'}}
+
+
+def upgrade():
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_comments_picture_id_created_at'), ['picture_id', 'created_at', 'id'], unique=False, **NEWEST_FIRST)
+        batch_op.create_index(batch_op.f('ix_comments_user_id_created_at'), ['user_id', 'created_at', 'id'], unique=False, **NEWEST_FIRST)
+
+    with op.batch_alter_table('pictures', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_pictures_user_id_created_at'), ['user_id', 'created_at', 'id'], unique=False, **NEWEST_FIRST)
+        batch_op.create_index(batch_op.f('ix_pictures_created_at'), ['created_at', 'id'], unique=False, **NEWEST_FIRST)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_users_created_at'), ['created_at', 'id'], unique=False, **NEWEST_FIRST)
+
+
+def downgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_users_created_at'))
+
+    with op.batch_alter_table('pictures', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pictures_created_at'))
+        batch_op.drop_index(batch_op.f('ix_pictures_user_id_created_at'))
+
+    with op.batch_alter_table('comments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_comments_user_id_created_at'))
+        batch_op.drop_index(batch_op.f('ix_comments_picture_id_created_at'))
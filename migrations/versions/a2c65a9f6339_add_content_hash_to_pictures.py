@@ -0,0 +1,28 @@
+"""Add content_hash to pictures
+
+Revision ID: a2c65a9f6339
+Revises: 54cc1e4d861c
+Create Date: 2026-10-18 15:10:42.390117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a2c65a9f6339'
+down_revision = '54cc1e4d861c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('pictures', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('content_hash', sa.String(length=64), nullable=True))
+        batch_op.create_index(batch_op.f('ix_pictures_content_hash'), ['content_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('pictures', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_pictures_content_hash'))
+        batch_op.drop_column('content_hash')
@@ -0,0 +1,36 @@
+"""Add blobs table for content-addressed picture storage
+
+Revision ID: a40a55f5e5da
+Revises: a2c65a9f6339
+Create Date: 2026-10-18 16:02:19.854420
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a40a55f5e5da'
+down_revision = 'a2c65a9f6339'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('blobs',
+        sa.Column('content_hash', sa.String(length=64), nullable=False),
+        sa.Column('path', sa.String(), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('refcount', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('content_hash')
+    )
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_blobs_path'), ['path'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blobs_path'))
+
+    op.drop_table('blobs')
@@ -0,0 +1,62 @@
+"""Add full-text index on picture descriptions
+
+Revision ID: ac58b01d4f24
+Revises: 7ebd3420a2e9
+Create Date: 2026-10-18 11:26:40.771843
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'ac58b01d4f24'
+down_revision = '7ebd3420a2e9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("""
+            CREATE VIRTUAL TABLE pictures_fts USING fts5(
+                description, content='pictures', content_rowid='id', tokenize='porter unicode61'
+            )
+        """)
+        op.execute("""
+            CREATE TRIGGER pictures_fts_ai AFTER INSERT ON pictures BEGIN
+                INSERT INTO pictures_fts(rowid, description) VALUES (new.id, new.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER pictures_fts_ad AFTER DELETE ON pictures BEGIN
+                INSERT INTO pictures_fts(pictures_fts, rowid, description) VALUES ('delete', old.id, old.description);
+            END
+        """)
+        op.execute("""
+            CREATE TRIGGER pictures_fts_au AFTER UPDATE OF description ON pictures BEGIN
+                INSERT INTO pictures_fts(pictures_fts, rowid, description) VALUES ('delete', old.id, old.description);
+                INSERT INTO pictures_fts(rowid, description) VALUES (new.id, new.description);
+            END
+        """)
+        # Index the pictures that already exist
+        op.execute("INSERT INTO pictures_fts(pictures_fts) VALUES ('rebuild')")
+    elif dialect == 'postgresql':
+        op.execute("""
+            ALTER TABLE pictures ADD COLUMN search_vector tsvector
+                GENERATED ALWAYS AS (to_tsvector('english', coalesce(description, ''))) STORED
+        """)
+        op.execute("CREATE INDEX ix_pictures_search_vector ON pictures USING GIN (search_vector)")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute("DROP TRIGGER IF EXISTS pictures_fts_au")
+        op.execute("DROP TRIGGER IF EXISTS pictures_fts_ad")
+        op.execute("DROP TRIGGER IF EXISTS pictures_fts_ai")
+        op.execute("DROP TABLE IF EXISTS pictures_fts")
+    elif dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_pictures_search_vector")
+        op.execute("ALTER TABLE pictures DROP COLUMN IF EXISTS search_vector")
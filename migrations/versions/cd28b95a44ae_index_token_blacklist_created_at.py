@@ -0,0 +1,26 @@
+"""Index token_blacklist.created_at for incremental revocation refresh
+
+Revision ID: cd28b95a44ae
+Revises: 4a32d1a2bc80
+Create Date: 2026-10-18 09:12:04.518230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'cd28b95a44ae'
+down_revision = '4a32d1a2bc80'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('token_blacklist', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_token_blacklist_created_at'), ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('token_blacklist', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_token_blacklist_created_at'))
@@ -0,0 +1,68 @@
+"""Store storage keys instead of upload paths
+
+Picture files are now addressed by a key relative to the storage backend,
+so the 'uploads/' prefix is dropped from stored paths.
+
+Revision ID: e959222535e8
+Revises: a40a55f5e5da
+Create Date: 2026-10-18 17:20:55.613904
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e959222535e8'
+down_revision = 'a40a55f5e5da'
+branch_labels = None
+depends_on = None
+
+
+PREFIX = 'uploads/'
+
+pictures = sa.table(
+    'pictures',
+    sa.column('id', sa.Integer),
+    sa.column('image_url', sa.String),
+    sa.column('variants', sa.JSON),
+)
+
+blobs = sa.table('blobs', sa.column('key', sa.String))
+
+
+def _rewrite_pictures(convert):
+    connection = op.get_bind()
+    rows = connection.execute(sa.select(pictures.c.id, pictures.c.image_url, pictures.c.variants)).all()
+    for row in rows:
+        values = {'image_url': convert(row.image_url)}
+        if row.variants:
+            values['variants'] = {size: convert(value) for size, value in row.variants.items()}
+        connection.execute(pictures.update().where(pictures.c.id == row.id).values(**values))
+
+
+def upgrade():
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blobs_path'))
+        batch_op.alter_column('path', new_column_name='key')
+
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_blobs_key'), ['key'], unique=False)
+
+    op.execute(
+        blobs.update().where(blobs.c.key.like(PREFIX + '%'))
+        .values(key=sa.func.substr(blobs.c.key, len(PREFIX) + 1))
+    )
+    _rewrite_pictures(lambda path: path[len(PREFIX):] if path.startswith(PREFIX) else path)
+
+
+def downgrade():
+    _rewrite_pictures(lambda key: PREFIX + key)
+    op.execute(blobs.update().values(key=sa.literal(PREFIX) + blobs.c.key))
+
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_blobs_key'))
+        batch_op.alter_column('key', new_column_name='path')
+
+    with op.batch_alter_table('blobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_blobs_path'), ['path'], unique=False)
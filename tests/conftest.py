@@ -0,0 +1,124 @@
+import io
+import os
+import shutil
+import tempfile
+
+import pytest
+from PIL import Image
+from sqlalchemy import event
+
+# Config reads the environment on import, so point it at a scratch
+# database and upload folder before the app is imported
+_workdir = tempfile.mkdtemp(prefix='ishare-tests-')
+os.environ['DATABASE_URL'] = 'sqlite:///' + os.path.join(_workdir, 'test.db')
+os.environ['UPLOAD_FOLDER'] = os.path.join(_workdir, 'uploads')
+os.environ['RATELIMIT_ENABLED'] = 'false'
+os.environ['BCRYPT_LOG_ROUNDS'] = '4'
+
+from api import create_app, db, feed, jobs, revocation_cache  # noqa: E402
+from api.auth import generate_token  # noqa: E402
+from api.models.user import User  # noqa: E402
+from api.search import ensure_search_index  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def app():
+    app = create_app()
+    app.config['TESTING'] = True
+    with app.app_context():
+        db.create_all()
+        ensure_search_index()
+    yield app
+    shutil.rmtree(_workdir, ignore_errors=True)
+
+
+@pytest.fixture(autouse=True)
+def clean_tables(app):
+    """empty every table after each test, and the in-memory state built from them"""
+    yield
+    with app.app_context():
+        for table in reversed(db.metadata.sorted_tables):
+            db.session.execute(table.delete())
+        db.session.commit()
+    feed.reset()
+    revocation_cache.reset()
+
+
+@pytest.fixture
+def app_context(app):
+    """an app context for tests that use the database directly
+
+    Requests made by the test client inside it would share its session, so
+    tests of endpoints leave it out and get a fresh session per request.
+    """
+    with app.app_context():
+        yield
+        db.session.rollback()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(app):
+    """create a user directly in the database; returns (user id, auth headers)"""
+    def make_user(username, role='user'):
+        with app.app_context():
+            user = User(username=username, email=f'{username}@example.com', role=role)
+            user.set_password('password')
+            db.session.add(user)
+            db.session.commit()
+            return user.id, {'Authorization': f'Bearer {generate_token(user)}'}
+    return make_user
+
+
+@pytest.fixture
+def add_pictures(app):
+    """create pictures of a user, each commented on once by every commenter; returns their ids"""
+    from api.models.comment import Comment
+    from api.models.picture import Picture
+
+    def add_pictures(owner_id, commenter_ids, count):
+        with app.app_context():
+            pictures = [Picture(user_id=owner_id, image_url=f'p{n}.png', description='d') for n in range(count)]
+            db.session.add_all(pictures)
+            db.session.flush()
+            db.session.add_all(Comment(user_id=user_id, picture_id=picture.id, content='c')
+                               for picture in pictures for user_id in commenter_ids)
+            db.session.commit()
+            return [picture.id for picture in pictures]
+    return add_pictures
+
+
+@pytest.fixture
+def queries(app):
+    """the SQL statements executed from now on, in order; clear() it to start counting"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', record)
+    yield statements
+    event.remove(engine, 'before_cursor_execute', record)
+
+
+@pytest.fixture
+def no_jobs(monkeypatch):
+    """keep background jobs from running, e.g. so they add no statements to a count"""
+    monkeypatch.setattr(jobs, 'enqueue', lambda name, **payload: None)
+
+
+@pytest.fixture
+def png():
+    """makes a small PNG file to upload"""
+    def png():
+        image = io.BytesIO()
+        Image.new('RGB', (20, 20), (200, 40, 40)).save(image, 'PNG')
+        image.seek(0)
+        return image
+    return png
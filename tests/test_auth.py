@@ -0,0 +1,37 @@
+from flask_jwt_extended import create_access_token
+
+
+def token_headers(app, user_id, **claims):
+    with app.app_context():
+        return {'Authorization': f'Bearer {create_access_token(identity=user_id, additional_claims=claims)}'}
+
+
+def test_admin_endpoints_authorize_from_the_perms_claim(app, client, make_user):
+    user_id, _ = make_user('member')
+
+    granted = token_headers(app, user_id, role='user', perms=['users:read'], ver=0)
+    assert client.get('/api/users', headers=granted).status_code == 200
+    assert client.get('/api/metrics', headers=granted).status_code == 403
+
+
+def test_admin_role_without_the_permission_is_refused(app, client, make_user):
+    admin_id, _ = make_user('admin', role='admin')
+
+    headers = token_headers(app, admin_id, role='admin', perms=['metrics:read'], ver=0)
+    assert client.get('/api/metrics', headers=headers).status_code == 200
+    assert client.get('/api/users', headers=headers).status_code == 403
+
+
+def test_tokens_without_claims_use_the_permissions_of_the_current_role(app, client, make_user):
+    admin_id, _ = make_user('admin', role='admin')
+    user_id, _ = make_user('member')
+
+    assert client.get('/api/users', headers=token_headers(app, admin_id)).status_code == 200
+    assert client.get('/api/users', headers=token_headers(app, user_id)).status_code == 403
+
+
+def test_outdated_token_version_is_refused(app, client, make_user):
+    admin_id, _ = make_user('admin', role='admin')
+
+    headers = token_headers(app, admin_id, role='admin', perms=['users:read'], ver=1)
+    assert client.get('/api/users', headers=headers).status_code == 401
@@ -0,0 +1,26 @@
+def test_bulk_comment_rejects_boolean_picture_ids(client, make_user, add_pictures):
+    owner_id, headers = make_user('owner')
+    picture_id, = add_pictures(owner_id, [], 1)
+    # true == 1 in Python, so an unchecked true would address this picture
+    assert picture_id == 1
+
+    response = client.post('/api/comments/bulk', headers=headers, json={'comments': [
+        {'picture_id': True, 'content': 'z'},
+        {'picture_id': picture_id, 'content': 'z'},
+    ]})
+    assert response.status_code == 200
+    assert [result['status'] for result in response.json['results']] == [404, 201]
+
+
+def test_bulk_picture_update_rejects_boolean_ids(client, make_user, add_pictures):
+    owner_id, headers = make_user('owner')
+    picture_id, = add_pictures(owner_id, [], 1)
+    # true == 1 in Python, so an unchecked true would address this picture
+    assert picture_id == 1
+
+    response = client.put('/api/pictures/bulk', headers=headers, json={'pictures': [
+        {'id': True, 'description': 'new'},
+        {'id': picture_id, 'description': 'new'},
+    ]})
+    assert response.status_code == 200
+    assert [result['status'] for result in response.json['results']] == [404, 200]
@@ -0,0 +1,93 @@
+import threading
+
+from api import feed
+
+
+def test_page_survives_concurrent_resets(app_context):
+    errors = []
+    done = threading.Event()
+
+    def reset_repeatedly():
+        while not done.is_set():
+            feed.reset()
+
+    resetter = threading.Thread(target=reset_repeatedly)
+    resetter.start()
+    try:
+        for _ in range(200):
+            try:
+                entries, more = feed.page()
+            except Exception as err:
+                errors.append(err)
+                break
+            assert entries == [] and not more
+    finally:
+        done.set()
+        resetter.join()
+    assert not errors
+
+
+def feed_ids(client, headers, **params):
+    response = client.get('/api/feed', headers=headers, query_string=params)
+    assert response.status_code == 200
+    return [picture['id'] for picture in response.json['pictures']]
+
+
+def test_writes_patch_the_timeline_in_place(client, make_user, add_pictures, no_jobs, png):
+    owner_id, headers = make_user('owner')
+    _, fan_headers = make_user('fan')
+    picture_id, = add_pictures(owner_id, [], 1)
+    assert feed_ids(client, headers) == [picture_id]
+    rebuilds = feed.stats()['rebuilds']
+
+    response = client.post('/api/pictures/upload', headers=headers,
+                           data={'file': (png(), 'photo.png'), 'description': 'a photo'})
+    uploaded_id = response.json['picture']['id']
+    assert feed_ids(client, headers) == [uploaded_id, picture_id]
+
+    client.post(f'/api/pictures/{picture_id}/comments', headers=fan_headers, json={'content': 'nice'})
+    client.post('/api/comments/bulk', headers=fan_headers, json={'comments': [
+        {'picture_id': picture_id, 'content': 'again'},
+        {'picture_id': uploaded_id, 'content': 'also nice'},
+    ]})
+    pictures = client.get('/api/feed', headers=headers).json['pictures']
+    assert {picture['id']: picture['comment_count'] for picture in pictures} == {picture_id: 2, uploaded_id: 1}
+    assert pictures[0]['username'] == 'owner'
+
+    client.delete(f'/api/pictures/{uploaded_id}', headers=headers)
+    assert feed_ids(client, headers) == [picture_id]
+    # Served from the patched timeline throughout
+    assert feed.stats()['rebuilds'] == rebuilds
+
+
+def test_cursor_pages_are_contiguous(client, make_user, add_pictures):
+    owner_id, headers = make_user('owner')
+    picture_ids = add_pictures(owner_id, [], 7)
+
+    seen, cursor = [], None
+    while True:
+        params = {'limit': 3, **({'cursor': cursor} if cursor else {})}
+        response = client.get('/api/feed', headers=headers, query_string=params)
+        seen.append([picture['id'] for picture in response.json['pictures']])
+        cursor = response.json['next_cursor']
+        if cursor is None:
+            break
+
+    assert [len(page) for page in seen] == [3, 3, 1]
+    assert [picture_id for page in seen for picture_id in page] == sorted(picture_ids, reverse=True)
+
+
+def test_timeline_keeps_only_the_newest_pictures(client, make_user, add_pictures, monkeypatch, no_jobs, png):
+    monkeypatch.setattr(feed, 'size', 3)
+    owner_id, headers = make_user('owner')
+    picture_ids = add_pictures(owner_id, [], 5)
+    assert feed_ids(client, headers) == picture_ids[:1:-1]
+
+    # An edit to a picture older than everything kept does not bring it back
+    client.put(f'/api/pictures/{picture_ids[0]}', headers=headers, data={'description': 'edited'})
+    assert feed_ids(client, headers) == picture_ids[:1:-1]
+
+    response = client.post('/api/pictures/upload', headers=headers,
+                           data={'file': (png(), 'photo.png'), 'description': 'a photo'})
+    assert feed_ids(client, headers) == [response.json['picture']['id'], *picture_ids[:2:-1]]
+    assert feed.stats()['entries'] == 3
@@ -0,0 +1,196 @@
+"""Pins the number of SQL statements hot endpoints may issue"""
+
+import pytest
+
+
+def warm_up(client, headers):
+    """make a first request, which also loads the revocation cache"""
+    assert client.get('/api/user', headers=headers).status_code == 200
+
+
+def test_user_listing_is_two_queries(client, make_user, queries):
+    _, headers = make_user('admin', role='admin')
+    for n in range(5):
+        make_user(f'user{n}')
+    warm_up(client, headers)
+
+    queries.clear()
+    response = client.get('/api/users', headers=headers)
+    assert response.status_code == 200
+    assert len(response.json['users']) == 6
+    # The token's user, then the page
+    assert len(queries) == 2, queries
+
+
+def test_promote_loads_the_requesting_user_once(client, make_user, queries):
+    _, headers = make_user('admin', role='admin')
+    target_id, _ = make_user('member')
+    warm_up(client, headers)
+
+    queries.clear()
+    response = client.put(f'/api/promote-user/{target_id}', headers=headers)
+    assert response.status_code == 200
+    # The token's user, the user being promoted, the update
+    assert len(queries) == 3, queries
+
+
+def test_demote_loads_the_requesting_user_once(client, make_user, queries):
+    _, headers = make_user('admin', role='admin')
+    target_id, _ = make_user('other', role='admin')
+    warm_up(client, headers)
+
+    queries.clear()
+    response = client.put(f'/api/demote-user/{target_id}', headers=headers)
+    assert response.status_code == 200
+    assert len(queries) == 3, queries
+
+
+@pytest.mark.parametrize('commenters', [1, 8])
+def test_picture_detail_with_includes_is_three_queries(client, make_user, add_pictures, queries, commenters):
+    owner_id, headers = make_user('owner')
+    commenter_ids = [make_user(f'fan{n}')[0] for n in range(commenters)]
+    picture_id, = add_pictures(owner_id, commenter_ids, 1)
+    warm_up(client, headers)
+
+    queries.clear()
+    response = client.get(f'/api/pictures/{picture_id}?include=comments,user', headers=headers)
+    assert response.status_code == 200
+    assert len(response.json['comments']) == commenters
+    assert {comment['user']['username'] for comment in response.json['comments']} == {
+        f'fan{n}' for n in range(commenters)}
+    # The token's user, the picture with its owner, its comments with their authors
+    assert len(queries) == 3, queries
+
+
+@pytest.mark.parametrize('pictures', [1, 8])
+def test_user_pictures_with_includes_is_three_queries(client, make_user, add_pictures, queries, pictures):
+    owner_id, headers = make_user('owner')
+    commenter_ids = [make_user(f'fan{n}')[0] for n in range(3)]
+    add_pictures(owner_id, commenter_ids, pictures)
+    warm_up(client, headers)
+
+    queries.clear()
+    response = client.get('/api/user/pictures?include=comments,user', headers=headers)
+    assert response.status_code == 200
+    assert len(response.json['pictures']) == pictures
+    assert all(len(picture['comments']) == 3 and picture['user']['username'] == 'owner'
+               for picture in response.json['pictures'])
+    assert len(queries) == 3, queries
+
+
+@pytest.mark.parametrize('method, url, kwargs, budget', [
+    ('get', '/api/user', {}, 1),
+    # The token's user, the username check, the update, the refreshed row
+    ('put', '/api/user', {'json': {'username': 'renamed'}}, 4),
+    ('put', '/api/change-password', {'json': {'current_password': 'password', 'new_password': 'secret2'}}, 2),
+])
+def test_account_endpoint_budgets(client, make_user, queries, method, url, kwargs, budget):
+    _, headers = make_user('owner')
+    warm_up(client, headers)
+
+    queries.clear()
+    response = getattr(client, method)(url, headers=headers, **kwargs)
+    assert response.status_code == 200
+    assert len(queries) == budget, queries
+
+
+def test_delete_account_budget(client, make_user, add_pictures, queries, no_jobs):
+    owner_id, _ = make_user('owner')
+    fan_id, headers = make_user('fan')
+    add_pictures(owner_id, [fan_id], 2)
+    warm_up(client, headers)
+
+    queries.clear()
+    assert client.delete('/api/user', headers=headers).status_code == 200
+    # The token's user, their commented pictures, the count fix-up, their comments, two deletes
+    assert len(queries) == 6, queries
+
+
+def test_upload_budget(client, make_user, queries, no_jobs, png):
+    _, headers = make_user('owner')
+    warm_up(client, headers)
+
+    queries.clear()
+    response = client.post('/api/pictures/upload', headers=headers,
+                           data={'file': (png(), 'photo.png'), 'description': 'a photo'})
+    assert response.status_code == 201
+    # The token's user, the blob upsert in a savepoint, the insert, the refreshed picture
+    assert len(queries) == 7, queries
+
+
+@pytest.mark.parametrize('method, path, kwargs, budget', [
+    ('get', '', {}, 2),
+    # The token's user, the picture, the update, the refreshed row
+    ('put', '', {'data': {'description': 'edited'}}, 4),
+    # The token's user, the picture, its comments, two deletes
+    ('delete', '', {}, 5),
+    ('post', '/comments', {'json': {'content': 'nice'}}, 5),
+    ('get', '/comments', {}, 3),
+])
+def test_picture_endpoint_budgets(client, make_user, add_pictures, queries, no_jobs, method, path, kwargs, budget):
+    owner_id, headers = make_user('owner')
+    fan_id, _ = make_user('fan')
+    picture_id, = add_pictures(owner_id, [fan_id], 1)
+    warm_up(client, headers)
+
+    queries.clear()
+    response = getattr(client, method)(f'/api/pictures/{picture_id}{path}', headers=headers, **kwargs)
+    assert response.status_code in (200, 201)
+    assert len(queries) == budget, queries
+
+
+def test_user_pictures_budget(client, make_user, add_pictures, queries):
+    owner_id, headers = make_user('owner')
+    add_pictures(owner_id, [], 8)
+    warm_up(client, headers)
+
+    queries.clear()
+    response = client.get('/api/user/pictures', headers=headers)
+    assert response.status_code == 200
+    assert len(response.json['pictures']) == 8
+    assert len(queries) == 2, queries
+
+
+@pytest.mark.parametrize('method, kwargs, budget', [
+    ('get', {}, 2),
+    ('put', {'json': {'content': 'edited'}}, 4),
+    ('delete', {}, 4),
+])
+def test_comment_endpoint_budgets(client, make_user, add_pictures, queries, method, kwargs, budget):
+    owner_id, _ = make_user('owner')
+    fan_id, headers = make_user('fan')
+    picture_id, = add_pictures(owner_id, [], 1)
+    response = client.post(f'/api/pictures/{picture_id}/comments', headers=headers, json={'content': 'nice'})
+    comment_id = response.json['comment']['id']
+
+    queries.clear()
+    response = getattr(client, method)(f'/api/comments/{comment_id}', headers=headers, **kwargs)
+    assert response.status_code == 200
+    assert len(queries) == budget, queries
+
+
+def test_feed_budget(client, make_user, add_pictures, queries):
+    owner_id, headers = make_user('owner')
+    add_pictures(owner_id, [], 8)
+    warm_up(client, headers)
+
+    queries.clear()
+    assert len(client.get('/api/feed', headers=headers).json['pictures']) == 8
+    # The first page rebuilds the timeline
+    assert len(queries) == 2, queries
+
+    queries.clear()
+    assert client.get('/api/feed', headers=headers).status_code == 200
+    # Later pages are served from memory
+    assert len(queries) == 1, queries
+
+
+def test_search_budget(client, make_user, add_pictures, queries):
+    owner_id, headers = make_user('owner')
+    add_pictures(owner_id, [], 3)
+    warm_up(client, headers)
+
+    queries.clear()
+    response = client.get('/api/pictures/search?q=d', headers=headers)
+    assert len(response.json['pictures']) == 3
+    assert len(queries) == 3, queries
@@ -0,0 +1,14 @@
+from api.queryplan import explain, full_scans, hot_queries
+
+
+def test_hot_queries_are_served_by_indexes(app_context):
+    findings = {name: full_scans(explain(query), seek) for name, query, seek in hot_queries()}
+    assert findings and not any(findings.values()), findings
+
+
+def test_unbounded_index_walk_is_reported_for_cursor_pages(app_context):
+    plan = ['SCAN pictures USING INDEX ix_pictures_created_at']
+    assert full_scans(plan) == []
+    assert full_scans(plan, seek=True) == [
+        'SCAN pictures USING INDEX ix_pictures_created_at', "no index range on the cursor"]
+    assert full_scans(['SEARCH comments USING INDEX ix_comments_picture_id_created_at (picture_id=?)'], seek=True)
@@ -0,0 +1,94 @@
+import pytest
+
+from api import limiter
+from api.ratelimit import MemoryStore, RedisStore, parse_rate
+
+
+class FakeRedis:
+    """a stand-in for a Redis server: enough of the protocol for RedisStore
+
+    Scripts are run by a real Lua interpreter (lupa), with redis.call served
+    from in-memory hashes and a clock the test moves by hand.
+    """
+
+    def __init__(self):
+        self.hashes = {}
+        self.expiry_ms = {}
+        self.now = 1700000000.25
+
+    def register_script(self, script):
+        lupa = pytest.importorskip('lupa')
+        lua = lupa.LuaRuntime(unpack_returned_tuples=True)
+        lua.globals().redis = lua.table_from({'call': lambda *args: self._call(lua, *args)})
+
+        def run(keys=(), args=()):
+            lua.globals().KEYS = lua.table(*keys)
+            lua.globals().ARGV = lua.table(*(str(arg) for arg in args))
+            return lua.execute(script)
+        return run
+
+    def _call(self, lua, command, *args):
+        if command == 'TIME':
+            seconds = int(self.now)
+            return lua.table(str(seconds), str(int((self.now - seconds) * 1000000)))
+        if command == 'HMGET':
+            fields = self.hashes.get(args[0], {})
+            return lua.table(*(fields.get(field, False) for field in args[1:]))
+        if command == 'HSET':
+            self.hashes.setdefault(args[0], {}).update(zip(args[1::2], args[2::2]))
+            return len(args[1:]) // 2
+        if command == 'PEXPIRE':
+            self.expiry_ms[args[0]] = int(args[1])
+            return 1
+        raise NotImplementedError(command)
+
+
+def test_redis_store_runs_token_buckets_in_lua():
+    client = FakeRedis()
+    store = RedisStore(client)
+    capacity, rate = parse_rate('2/minute')
+
+    assert store.take('login:ip:1.2.3.4', capacity, rate) == 0
+    assert store.take('login:ip:1.2.3.4', capacity, rate) == 0
+    assert store.take('login:ip:1.2.3.4', capacity, rate) == pytest.approx(30)
+    # Buckets are per key and expire once they would be full again
+    assert store.take('login:ip:5.6.7.8', capacity, rate) == 0
+    assert client.expiry_ms['ratelimit:login:ip:1.2.3.4'] == 60000
+
+    client.now += 30
+    assert store.take('login:ip:1.2.3.4', capacity, rate) == 0
+
+
+@pytest.fixture
+def limited(monkeypatch):
+    """turn the limiter on with 2 attempts per minute, in memory"""
+    def limited(store=None):
+        monkeypatch.setattr(limiter, 'enabled', True)
+        monkeypatch.setattr(limiter, 'store', store or MemoryStore())
+        monkeypatch.setattr(limiter, 'ip_rate', parse_rate('2/minute'))
+        monkeypatch.setattr(limiter, 'account_rate', parse_rate('2/minute'))
+    return limited
+
+
+def test_rejected_login_costs_no_queries(client, limited, queries):
+    limited()
+    credentials = {'email': 'nobody@example.com', 'password': 'wrong'}
+    for _ in range(2):
+        assert client.post('/api/login', json=credentials).status_code != 429
+
+    queries.clear()
+    response = client.post('/api/login', json=credentials)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
+    assert queries == []
+
+
+def test_redis_store_limits_requests(client, limited):
+    limited(RedisStore(FakeRedis()))
+    credentials = {'email': 'nobody@example.com', 'password': 'wrong'}
+    for _ in range(2):
+        assert client.post('/api/login', json=credentials).status_code != 429
+
+    response = client.post('/api/login', json=credentials)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '30'
@@ -0,0 +1,80 @@
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from api import db
+from api.models.tokenblacklist import TokenBlacklist
+from api.revocation import RevocationCache
+
+
+def revoke(*jtis, created_at=None):
+    """insert blacklist rows directly, as another worker's logout would"""
+    created_at = created_at or datetime.now(timezone.utc)
+    db.session.add_all(TokenBlacklist(jti=jti, created_at=created_at) for jti in jtis)
+    db.session.commit()
+
+
+def new_cache(refresh_interval=30, capacity=1000):
+    cache = RevocationCache()
+    cache.refresh_interval = refresh_interval
+    cache.capacity = capacity
+    return cache
+
+
+def expire(cache):
+    """make the next check refresh, as if REVOCATION_REFRESH_SECONDS had passed"""
+    cache._last_refresh -= cache.refresh_interval
+
+
+def test_revoked_tokens_are_never_answered_not_revoked(app_context):
+    revoked = [str(uuid.uuid4()) for _ in range(200)]
+    revoke(*revoked)
+    cache = new_cache()
+
+    assert all(cache.is_revoked(jti) for jti in revoked)
+    assert not any(cache.is_revoked(str(uuid.uuid4())) for _ in range(200))
+    assert cache.stats()['entries'] == 200
+
+
+def test_own_revocations_apply_immediately(app_context):
+    cache = new_cache()
+    cache.is_revoked('warm-up')
+
+    jti = str(uuid.uuid4())
+    revoke(jti)
+    cache.add(jti)
+    assert cache.is_revoked(jti)
+
+
+def test_other_workers_revocations_arrive_after_the_refresh_interval(app_context, queries):
+    revoke('earlier')
+    cache = new_cache()
+    assert cache.is_revoked('earlier')
+    watermark = cache.stats()['watermark']
+
+    # One row committed just now, one committed late with an older created_at
+    revoke('other-worker')
+    revoke('late-commit', created_at=datetime.fromisoformat(watermark) - timedelta(seconds=10))
+    assert not cache.is_revoked('other-worker')
+
+    expire(cache)
+    queries.clear()
+    assert cache.is_revoked('other-worker')
+    assert cache.is_revoked('late-commit')
+    assert cache.stats()['refreshes'] == 2
+    # Only rows from one interval before the watermark on are read again
+    assert 'token_blacklist.created_at >=' in queries[0]
+
+
+def test_full_filter_is_rebuilt_larger(app_context):
+    revoked = [f'jti-{n}' for n in range(4)]
+    revoke(*revoked)
+    cache = new_cache(capacity=4)
+    assert cache.is_revoked(revoked[0])
+    assert cache.stats()['capacity'] == 4
+
+    revoke('one-more')
+    expire(cache)
+    assert cache.is_revoked('one-more')
+    stats = cache.stats()
+    assert stats['capacity'] == 8 and stats['entries'] == 5
+    assert all(cache.is_revoked(jti) for jti in revoked)
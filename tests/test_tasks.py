@@ -0,0 +1,28 @@
+import io
+
+from api import db, storage
+from api.models.blob import Blob
+from api.tasks import delete_files
+
+REUSED = 'a' * 64
+GONE = 'b' * 64
+
+
+def store(*keys):
+    for key in keys:
+        storage.put(key, io.BytesIO(b'data'))
+    return list(keys)
+
+
+def test_delete_files_keeps_originals_and_variants_of_reuploaded_content(app_context):
+    db.session.add(Blob(content_hash=REUSED, key=f'aa/bb/{REUSED}.png', size=4, refcount=1))
+    db.session.commit()
+    kept = store(f'aa/bb/{REUSED}.png', f'aa/bb/{REUSED}_128.webp', f'aa/bb/{REUSED}_512.webp')
+    removed = store(f'cc/dd/{GONE}.png', f'cc/dd/{GONE}_128.webp', 'legacy_photo.png')
+
+    delete_files(kept + removed)
+
+    assert all(storage.exists(key) for key in kept)
+    assert not any(storage.exists(key) for key in removed)
+    # The claim on the deleted content is released again
+    assert Blob.query.filter_by(content_hash=GONE).count() == 0